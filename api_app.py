@@ -1,13 +1,29 @@
+import asyncio
+import json
 import logging
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Annotated, AsyncIterator, Awaitable, Callable
 
-from fastapi import FastAPI, HTTPException
+from fastapi import Body, FastAPI, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel
 
 from github_events_api.data_storage import (
     Statistics,
     check_database_exists,
-    find_all_stats,
+    find_repositories_by_full_names,
+    find_repository_by_full_name,
+    find_sketches_by_repo_ids_and_types,
+    find_statistics_history,
     find_stats_by_params,
+    find_stats_by_repo_ids_and_types,
+    find_stats_page,
+    find_time_diff_quantiles,
 )
+from github_events_api.live_updates import StatisticsBroadcaster
+from github_events_api.metrics import API_REQUEST_SECONDS, render_metrics
 
 log = logging.getLogger(__name__)
 
@@ -16,7 +32,70 @@ API_DESCR = "This API will give you average time difference between following "
 "Github events of same type for given repository. The metric is in seconds."
 API_VERSION = "1.0.0"
 
-app = FastAPI(title=API_TITLE, description=API_DESCR, version=API_VERSION)
+# max number of (repo_owner, repo_name, event_type) queries in one batch request
+STATS_BATCH_MAX_SIZE = 1000
+# number of statistics records returned in one page of all statistics
+STATS_PAGE_DEFAULT_SIZE = 1000
+STATS_PAGE_MAX_SIZE = 10000
+# header with cursor to pass as "cursor" to get the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+# comment sent to idle live update streams so that proxies do not close the connection
+SSE_KEEPALIVE_SECS = 15.0
+
+broadcaster = StatisticsBroadcaster()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    # single db poller shared by all live update subscribers
+    task = asyncio.create_task(broadcaster.run())
+    yield
+    task.cancel()
+
+
+app = FastAPI(title=API_TITLE, description=API_DESCR, version=API_VERSION, lifespan=lifespan)
+
+
+@app.middleware("http")
+async def measure_latency(
+    request: Request, call_next: Callable[[Request], Awaitable[Response]]
+) -> Response:
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+    except Exception:
+        # unhandled exception is turned into 500 response by the server
+        _observe_latency(request, time.perf_counter() - start, 500)
+        raise
+
+    _observe_latency(request, time.perf_counter() - start, response.status_code)
+    return response
+
+
+def _observe_latency(request: Request, seconds: float, status: int) -> None:
+    # route template instead of raw path, to keep number of label values bounded
+    route = request.scope.get("route")
+    API_REQUEST_SECONDS.observe(
+        seconds,
+        method=request.method,
+        path=getattr(route, "path", "unmatched"),
+        status=status,
+    )
+
+
+class StatisticsQuery(BaseModel):
+    repo_owner: str
+    repo_name: str
+    event_type: str
+
+    @property
+    def full_name(self):
+        return f"{self.repo_owner}/{self.repo_name}"
+
+
+@app.get("/metrics", include_in_schema=False)
+def get_metrics() -> PlainTextResponse:
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
 
 
 def verify_database():
@@ -24,10 +103,55 @@ def verify_database():
         raise HTTPException(status_code=500, detail="Database does not exist.")
 
 
+def _format_cursor(generation: int | None, after_id: int) -> str:
+    # generation is None for db without any statistics generation
+    return f"{generation or 0}.{after_id}"
+
+
+def _parse_cursor(cursor: str) -> tuple[int | None, int]:
+    try:
+        generation, after_id = (int(p) for p in cursor.split("."))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail="Invalid cursor.") from e
+    return generation or None, after_id
+
+
 @app.get("/", response_model=list[Statistics])
-def get_all_stats():
+def get_all_stats(
+    cursor: str | None = None,
+    limit: Annotated[int, Query(ge=1, le=STATS_PAGE_MAX_SIZE)] = STATS_PAGE_DEFAULT_SIZE,
+    ndjson: bool = False,
+) -> Response:
+    """
+    Get statistics page by page, ordered by their id. Pass "X-Next-Cursor" response header as
+    "cursor" to get the next page; the header is missing on the last page.
+    Cursor is valid only until statistics are recalculated by the next ingestion; then request
+    fails with status 410 and paging has to start again from the first page.
+    With "ndjson" set, records are streamed as newline delimited JSON.
+    """
     verify_database()
-    return find_all_stats()
+    generation, after_id = _parse_cursor(cursor) if cursor is not None else (None, None)
+    # one more record tells whether there is a next page
+    page_generation, stats = find_stats_page(after_id=after_id, limit=limit + 1)
+    if cursor is not None and page_generation != generation:
+        raise HTTPException(
+            status_code=410, detail="Statistics were recalculated, start from the first page."
+        )
+
+    headers = {}
+    if len(stats) > limit:
+        stats = stats[:limit]
+        headers[NEXT_CURSOR_HEADER] = _format_cursor(page_generation, stats[-1]["id"])
+
+    # rows are already plain dictionaries, so pydantic validation of response is skipped
+    if ndjson:
+        return StreamingResponse(
+            (json.dumps(s) + "\n" for s in stats),
+            media_type="application/x-ndjson",
+            headers=headers,
+        )
+
+    return Response(content=json.dumps(stats), media_type="application/json", headers=headers)
 
 
 @app.get("/statistics/")
@@ -42,8 +166,149 @@ def get_stats_by_params(repo_owner: str, repo_name: str, event_type: str) -> dic
         repo_name=repo_name,
         event_type=event_type,
     )
+    quantiles = find_time_diff_quantiles(
+        repo_owner=repo_owner,
+        repo_name=repo_name,
+        event_type=event_type,
+    )
 
     return {
         "query": {"repo_owner": repo_owner, "repo_name": repo_name, "event_type": event_type},
         "result": stats,
+        "time_diff_quantiles_secs": quantiles,
+    }
+
+
+@app.post("/statistics/batch")
+def get_stats_batch(
+    queries: Annotated[list[StatisticsQuery], Body(max_length=STATS_BATCH_MAX_SIZE)],
+) -> dict:
+    """
+    Get statistics for many repository and event type pairs in one request.
+    Repositories, statistics and quantiles are each fetched in single db query. Result is None
+    for queries with unknown repository.
+    """
+    verify_database()
+    log.debug(f"get_stats_batch called with {len(queries)} queries")
+
+    repositories = find_repositories_by_full_names([q.full_name for q in queries])
+    keys = [
+        (repositories[q.full_name].id, q.event_type) for q in queries if q.full_name in repositories
+    ]
+
+    stats: dict[tuple[int, str], list[Statistics]] = {}
+    for s in find_stats_by_repo_ids_and_types(keys):
+        stats.setdefault((s.repo_id, s.event_type), []).append(s)
+    quantiles = {
+        (s.repo_id, s.event_type): s.to_quantiles()
+        for s in find_sketches_by_repo_ids_and_types(keys)
+    }
+
+    results = []
+    for q in queries:
+        repository = repositories.get(q.full_name)
+        key = (repository.id, q.event_type) if repository else None
+        results.append(
+            {
+                "query": q.model_dump(),
+                "result": stats.get(key, []) if key else None,
+                "time_diff_quantiles_secs": quantiles.get(key) if key else None,
+            }
+        )
+
+    return {"results": results}
+
+
+async def _stream_stats_updates(
+    request: Request, queue: asyncio.Queue, repo_id: int | None, event_type: str | None
+) -> AsyncIterator[str]:
+    """Yield Server-Sent Events with changed statistics matching given filters."""
+    try:
+        while not await request.is_disconnected():
+            try:
+                changed = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE_SECS)
+            except TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+
+            stats = [
+                s
+                for s in changed
+                if (repo_id is None or s["repo_id"] == repo_id)
+                and (event_type is None or s["event_type"] == event_type)
+            ]
+            if stats:
+                yield f"event: statistics\ndata: {json.dumps(stats)}\n\n"
+    finally:
+        broadcaster.unsubscribe(queue)
+
+
+@app.get("/statistics/stream")
+async def stream_stats(
+    request: Request,
+    repo_owner: str | None = None,
+    repo_name: str | None = None,
+    event_type: str | None = None,
+) -> StreamingResponse:
+    """
+    Push statistics changed by each ingestion run as Server-Sent Events.
+    Updates can be filtered by repository (both owner and name are needed) and event type.
+    """
+    verify_database()
+    log.debug(
+        f"stream_stats called with repo_owner={repo_owner}, repo_name={repo_name}, "
+        f"event_type={event_type}"
+    )
+
+    repo_id = None
+    if repo_owner is not None or repo_name is not None:
+        if repo_owner is None or repo_name is None:
+            raise HTTPException(
+                status_code=422, detail="Both repo_owner and repo_name have to be set."
+            )
+        repository = await asyncio.to_thread(
+            find_repository_by_full_name, f"{repo_owner}/{repo_name}"
+        )
+        if repository is None:
+            raise HTTPException(status_code=404, detail="Repository does not exist.")
+        repo_id = repository.id
+
+    queue = broadcaster.subscribe()
+    return StreamingResponse(
+        _stream_stats_updates(request, queue, repo_id, event_type),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
+
+
+@app.get("/statistics/history/")
+def get_stats_history(
+    repo_owner: str, repo_name: str, event_type: str, start: datetime, end: datetime
+) -> dict:
+    """
+    Get statistics snapshots computed between "start" and "end" (both inclusive).
+    Times without timezone are in UTC.
+    """
+    verify_database()
+    log.debug(
+        f"get_stats_history called with repo_owner={repo_owner}, repo_name={repo_name}, "
+        f"event_type={event_type}, start={start}, end={end}"
+    )
+    history = find_statistics_history(
+        repo_owner=repo_owner,
+        repo_name=repo_name,
+        event_type=event_type,
+        start=start,
+        end=end,
+    )
+
+    return {
+        "query": {
+            "repo_owner": repo_owner,
+            "repo_name": repo_name,
+            "event_type": event_type,
+            "start": start,
+            "end": end,
+        },
+        "result": history,
     }
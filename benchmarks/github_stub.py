@@ -0,0 +1,115 @@
+import hashlib
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Github API has default 30, max limit 100
+DEFAULT_PER_PAGE = 30
+MAX_PER_PAGE = 100
+RATE_LIMIT = 5000
+
+
+class GithubStubServer:
+    """
+    Local HTTP stub of Github API endpoints used by this project:
+    - /repos/{owner}/{name}
+    - /repos/{owner}/{name}/events with pagination, ETag and rate limit headers
+
+    Use it as context manager; it serves on random free port of localhost.
+    """
+
+    def __init__(self, dataset: list[tuple[dict, list[dict]]]):
+        self.repositories = {r["full_name"]: r for r, _ in dataset}
+        self.events = {r["full_name"]: e for r, e in dataset}
+        self.requests_count = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host!s}:{port}"
+
+    def __enter__(self) -> "GithubStubServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def add_events(self, full_name: str, events: list[dict]) -> None:
+        """Add new events on top of the repository events, as they would occur."""
+        self.events[full_name] = events + self.events[full_name]
+
+    def events_etag(self, full_name: str) -> str:
+        events = self.events[full_name]
+        latest_id = events[0]["id"] if events else ""
+        return hashlib.md5(f"{full_name}:{latest_id}".encode()).hexdigest()
+
+    def _handler_class(self) -> type[BaseHTTPRequestHandler]:
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args) -> None:
+                pass
+
+            def _send(self, status: int, body: object = None, headers: dict | None = None):
+                with stub._lock:
+                    stub.requests_count += 1
+                    remaining = max(RATE_LIMIT - stub.requests_count, 0)
+
+                content = json.dumps(body).encode() if body is not None else b""
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(content)))
+                self.send_header("X-RateLimit-Limit", str(RATE_LIMIT))
+                self.send_header("X-RateLimit-Remaining", str(remaining))
+                self.send_header("X-RateLimit-Reset", "0")
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(content)
+
+            def do_GET(self) -> None:
+                url = urlparse(self.path)
+                parts = url.path.strip("/").split("/")
+                if len(parts) < 3 or parts[0] != "repos":
+                    return self._send(404, {"message": "Not Found"})
+
+                full_name = f"{parts[1]}/{parts[2]}"
+                if full_name not in stub.repositories:
+                    return self._send(404, {"message": "Not Found"})
+
+                if len(parts) == 3:
+                    return self._send(200, stub.repositories[full_name])
+                if len(parts) == 4 and parts[3] == "events":
+                    return self._send_events(full_name, parse_qs(url.query))
+
+                return self._send(404, {"message": "Not Found"})
+
+            def _send_events(self, full_name: str, query: dict) -> None:
+                etag = stub.events_etag(full_name)
+                if_none_match = self.headers.get("If-None-Match", "")
+                if if_none_match.removeprefix("W/").strip('"') == etag:
+                    return self._send(304)
+
+                per_page = min(int(query.get("per_page", [DEFAULT_PER_PAGE])[0]), MAX_PER_PAGE)
+                page = int(query.get("page", [1])[0])
+                events = stub.events[full_name]
+                last_page = max((len(events) + per_page - 1) // per_page, 1)
+
+                headers = {"ETag": f'W/"{etag}"'}
+                if last_page > 1:
+                    base_url = f"{stub.url}/repos/{full_name}/events?per_page={per_page}"
+                    links = []
+                    if page < last_page:
+                        links.append(f'<{base_url}&page={page + 1}>; rel="next"')
+                    links.append(f'<{base_url}&page={last_page}>; rel="last"')
+                    headers["Link"] = ", ".join(links)
+
+                self._send(200, events[(page - 1) * per_page : page * per_page], headers)
+
+        return Handler
@@ -0,0 +1,227 @@
+"""
+End-to-end benchmarks of ingestion, statistics calculation, API latency and API cold start.
+Events are generated synthetically and served by local Github API stub, data are stored in
+temporary SQLite db. Results are written as JSON; every benchmark has "seconds" value which is
+used to detect regressions against results of previous run.
+
+Run with `python -m benchmarks.run_benchmarks --help`.
+"""
+
+import argparse
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable
+from unittest import mock
+
+from fastapi.testclient import TestClient
+from sqlmodel import SQLModel, create_engine
+
+from api_app import app
+from benchmarks.github_stub import GithubStubServer
+from benchmarks.startup import bench_startup
+from benchmarks.synthetic import generate_dataset
+from download_data import download_events
+from github_events_api import data_storage, github_api
+from github_events_api.calculations import (
+    calculate_rolling_avg_time_diff_per_event_type,
+    load_events_data_into_df,
+)
+from github_events_api.configuation import RepositoryConfig
+from github_events_api.profiling import StageProfiler
+
+log = logging.getLogger(__name__)
+
+DEFAULT_OUTPUT = "bench_results.json"
+# relative slowdown against baseline which is reported as regression
+DEFAULT_TOLERANCE = 0.2
+
+
+def _timed(func: Callable, *args, **kwargs) -> tuple[Any, float]:
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def bench_ingest(repos: tuple[RepositoryConfig, ...]) -> dict:
+    """Download repositories and their events from the stub and store them into db."""
+    events_before = len(data_storage.find_all_events())
+    _, seconds = _timed(download_events, repos, "token", StageProfiler())
+    n_events = len(data_storage.find_all_events()) - events_before
+
+    return {"seconds": seconds, "events": n_events, "events_per_sec": n_events / seconds}
+
+
+def bench_not_modified(repos: tuple[RepositoryConfig, ...]) -> dict:
+    """Run ingestion again with etags stored by previous run, when nothing has changed."""
+    _, seconds = _timed(download_events, repos, "token", StageProfiler())
+
+    return {"seconds": seconds, "requests": len(repos)}
+
+
+def bench_statistics() -> dict:
+    """Calculate statistics from all stored events, timing each stage."""
+    events, find_secs = _timed(data_storage.find_all_events)
+    events_df, load_secs = _timed(load_events_data_into_df, events)
+    stats, calc_secs = _timed(calculate_rolling_avg_time_diff_per_event_type, events_df)
+    _, store_secs = _timed(data_storage.replace_statistics, stats, datetime(2024, 8, 28))
+
+    return {
+        "seconds": find_secs + load_secs + calc_secs + store_secs,
+        "stages": {
+            "find_all_events": find_secs,
+            "load_events_data_into_df": load_secs,
+            "calculate_rolling_avg_time_diff_per_event_type": calc_secs,
+            "replace_statistics": store_secs,
+        },
+        "events": len(events),
+        "statistics": len(stats),
+    }
+
+
+def bench_api(
+    client: TestClient, method: str, url: str, n_requests: int, **kwargs
+) -> dict[str, float]:
+    """Send requests to API endpoint; "seconds" is median latency."""
+    latencies = []
+    for _ in range(n_requests):
+        response, seconds = _timed(client.request, method, url, **kwargs)
+        response.raise_for_status()
+        latencies.append(seconds)
+
+    latencies.sort()
+    return {
+        "seconds": statistics.median(latencies),
+        "mean_secs": statistics.fmean(latencies),
+        "p95_secs": latencies[int(0.95 * (len(latencies) - 1))],
+        "requests": n_requests,
+    }
+
+
+def run_benchmarks(
+    n_repos: int, n_events: int, n_requests: int, n_startup_runs: int = 5
+) -> dict[str, dict]:
+    dataset = generate_dataset(n_repos, n_events)
+    repos = tuple(RepositoryConfig(owner=r["owner"]["login"], name=r["name"]) for r, _ in dataset)
+    results = {}
+
+    with tempfile.TemporaryDirectory() as tmp_dir, GithubStubServer(dataset) as stub:
+        engine = create_engine(f"sqlite:///{Path(tmp_dir) / 'bench.db'}")
+        SQLModel.metadata.create_all(engine)
+
+        with (
+            mock.patch.object(data_storage, "engine", engine),
+            mock.patch.object(github_api, "GITHUB_API_REPOS_URL", f"{stub.url}/repos"),
+        ):
+            results["ingest"] = bench_ingest(repos)
+            results["ingest_not_modified"] = bench_not_modified(repos)
+            results["statistics"] = bench_statistics()
+
+            client = TestClient(app)
+            query = {"repo_owner": repos[0].owner, "repo_name": repos[0].name}
+            results["api_all_stats"] = bench_api(client, "GET", "/", n_requests)
+            results["api_stats_by_params"] = bench_api(
+                client,
+                "GET",
+                "/statistics/",
+                n_requests,
+                params={**query, "event_type": "WatchEvent"},
+            )
+            results["api_stats_batch"] = bench_api(
+                client,
+                "POST",
+                "/statistics/batch",
+                n_requests,
+                json=[
+                    {"repo_owner": r.owner, "repo_name": r.name, "event_type": "WatchEvent"}
+                    for r in repos
+                ],
+            )
+
+        engine.dispose()
+
+    results["api_startup"] = bench_startup(n_startup_runs)
+
+    return results
+
+
+def compare_results(baseline: dict, current: dict, tolerance: float) -> list[str]:
+    """Get list of benchmarks which are slower than baseline by more than given tolerance."""
+    regressions = []
+    for name, result in current["benchmarks"].items():
+        baseline_result = baseline["benchmarks"].get(name)
+        if baseline_result is None:
+            continue
+        if result["seconds"] > baseline_result["seconds"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: {result['seconds']:.4f}s, baseline {baseline_result['seconds']:.4f}s"
+            )
+
+    return regressions
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Run end-to-end benchmarks.")
+    parser.add_argument("--repos", type=int, default=5, help="number of repositories")
+    parser.add_argument("--events", type=int, default=300, help="number of events per repo")
+    parser.add_argument("--requests", type=int, default=50, help="number of requests per API")
+    parser.add_argument("--startup-runs", type=int, default=5, help="number of API cold starts")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="path to JSON results")
+    parser.add_argument("--baseline", help="path to JSON results to compare with")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    results = {
+        "metadata": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "parameters": {
+                "repos": args.repos,
+                "events": args.events,
+                "requests": args.requests,
+                "startup_runs": args.startup_runs,
+            },
+        },
+        "benchmarks": run_benchmarks(args.repos, args.events, args.requests, args.startup_runs),
+    }
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    log.info(f"Benchmark results written into {args.output}.")
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        regressions = compare_results(baseline, results, args.tolerance)
+        for r in regressions:
+            log.error(f"Regression in {r}")
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    # per request and per batch logs of the package would distort the timings
+    logging.getLogger("github_events_api").setLevel(logging.WARNING)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    sys.exit(main())
@@ -0,0 +1,65 @@
+"""
+Measure cold start of API worker: time and peak memory (RSS) of a fresh interpreter importing
+`api_app`, and import time of the module from `python -X importtime`.
+
+Run with `python -m benchmarks.startup`.
+"""
+
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+# modules which should not be imported by API workers
+HEAVY_MODULES = ("pandas", "numpy")
+
+_STARTUP_SCRIPT = f"""
+import json, resource, sys
+import api_app
+print(json.dumps({{
+    "max_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "heavy_modules": sorted(m for m in {HEAVY_MODULES!r} if m in sys.modules),
+}}))
+"""
+
+
+def _run_python(*args: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *args], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+    )
+
+
+def measure_import_time(module: str = "api_app") -> float:
+    """Get cumulative import time of the module in seconds, reported by `-X importtime`."""
+    stderr = _run_python("-X", "importtime", "-c", f"import {module}").stderr
+    for line in stderr.splitlines():
+        # format: "import time: self [us] | cumulative | imported package"
+        parts = [p.strip() for p in line.removeprefix("import time:").split("|")]
+        if len(parts) == 3 and parts[2] == module:
+            return int(parts[1]) / 1_000_000
+
+    raise ValueError(f"Import time of module {module} not found.")
+
+
+def bench_startup(n_runs: int = 5) -> dict:
+    """Start fresh interpreter importing the API app; "seconds" is median wall time."""
+    wall_times = []
+    for _ in range(n_runs):
+        start = time.perf_counter()
+        result = json.loads(_run_python("-c", _STARTUP_SCRIPT).stdout)
+        wall_times.append(time.perf_counter() - start)
+
+    return {
+        "seconds": statistics.median(wall_times),
+        "import_secs": statistics.median(measure_import_time() for _ in range(n_runs)),
+        "max_rss_kib": result["max_rss_kib"],
+        "heavy_modules": result["heavy_modules"],
+        "runs": n_runs,
+    }
+
+
+if __name__ == "__main__":
+    print(json.dumps(bench_startup(), indent=2))
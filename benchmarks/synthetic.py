@@ -0,0 +1,76 @@
+import random
+from datetime import datetime, timedelta
+
+EVENT_TYPES = (
+    "WatchEvent",
+    "PushEvent",
+    "IssueCommentEvent",
+    "PullRequestEvent",
+    "IssuesEvent",
+    "CreateEvent",
+    "ForkEvent",
+)
+DEFAULT_START = datetime(2024, 8, 1)
+
+
+def generate_repository(repo_id: int, owner: str, name: str) -> dict:
+    """Create payload of Github API repository endpoint."""
+    return {
+        "id": repo_id,
+        "name": name,
+        "full_name": f"{owner}/{name}",
+        "owner": {"login": owner, "id": repo_id * 10},
+        "private": False,
+    }
+
+
+def generate_events(
+    repository: dict,
+    n_events: int,
+    first_event_id: int = 1,
+    start: datetime = DEFAULT_START,
+    mean_time_diff_secs: float = 600.0,
+    seed: int = 0,
+) -> list[dict]:
+    """
+    Create payload of Github API events endpoint for given repository.
+    Time differences between events are drawn from exponential distribution. Events are ordered
+    from the most recent one, as Github API returns them.
+    """
+    rng = random.Random(seed)
+    created_at = start
+    events = []
+    for n in range(n_events):
+        created_at += timedelta(seconds=int(rng.expovariate(1 / mean_time_diff_secs)))
+        actor_id = rng.randint(1, 10_000)
+        events.append(
+            {
+                "id": str(first_event_id + n),
+                "type": rng.choice(EVENT_TYPES),
+                "actor": {"id": actor_id, "login": f"user-{actor_id}"},
+                "repo": {"id": repository["id"], "name": repository["full_name"]},
+                "payload": {},
+                "public": True,
+                "created_at": created_at.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            }
+        )
+
+    return events[::-1]
+
+
+def generate_dataset(
+    n_repos: int, n_events_per_repo: int, seed: int = 0
+) -> list[tuple[dict, list[dict]]]:
+    """Create repositories with their events. Event ids are unique across all repositories."""
+    dataset = []
+    for n in range(n_repos):
+        repository = generate_repository(repo_id=n + 1, owner=f"owner-{n}", name=f"repo-{n}")
+        events = generate_events(
+            repository,
+            n_events_per_repo,
+            first_event_id=n * n_events_per_repo + 1,
+            seed=seed + n,
+        )
+        dataset.append((repository, events))
+
+    return dataset
@@ -0,0 +1,97 @@
+import argparse
+import gzip
+import logging
+from datetime import datetime, timezone
+from pathlib import Path
+
+from github_events_api.constants import EVENTS_ARCHIVE_DIR, STATS_WINDOW_DAYS
+from github_events_api.data_storage import (
+    check_database_exists,
+    delete_events_before,
+    find_event_window_starts,
+    find_events_before,
+    vacuum_database,
+)
+
+log = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+
+def archive_events(window_starts: dict[tuple[int, str], datetime], archive_dir: str) -> Path:
+    """
+    Write events which happened before statistics window into gzip compressed JSON lines file.
+    Return path to the archive.
+    """
+    Path(archive_dir).mkdir(parents=True, exist_ok=True)
+    timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    archive_path = Path(archive_dir) / f"events-{timestamp}.jsonl.gz"
+
+    count = 0
+    with gzip.open(archive_path, "wt") as f:
+        for (repo_id, event_type), before in window_starts.items():
+            for event in find_events_before(repo_id, event_type, before):
+                f.write(event.model_dump_json() + "\n")
+                count += 1
+
+    log.info(f"Archived {count} events into {archive_path}.")
+    return archive_path
+
+
+def main(
+    keep_days: int = STATS_WINDOW_DAYS,
+    archive_dir: str | None = None,
+    vacuum_pages: int | None = None,
+):
+    """
+    Prune events which can no longer affect statistics and release freed space of the db.
+    Events older than "keep_days" before the latest event of the same repository and type are
+    deleted; keeping less than the statistics window would change the statistics.
+    """
+    if keep_days < STATS_WINDOW_DAYS:
+        raise ValueError(
+            f"Events have to be kept at least for statistics window of {STATS_WINDOW_DAYS} days."
+        )
+    if not check_database_exists():
+        raise FileNotFoundError("Database does not exist, run download_data.py first.")
+
+    logging.info("Starting the compaction process...")
+    window_starts = find_event_window_starts(keep_days)
+
+    if archive_dir is not None:
+        archive_events(window_starts, archive_dir)
+
+    delete_events_before(window_starts)
+    vacuum_database(vacuum_pages)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Prune events outside of statistics window and compact the db."
+    )
+    parser.add_argument(
+        "--keep-days",
+        type=int,
+        default=STATS_WINDOW_DAYS,
+        help="keep events of this number of days before the latest event of given type",
+    )
+    parser.add_argument(
+        "--archive",
+        action="store_true",
+        help=f"write pruned events into compressed archive in {EVENTS_ARCHIVE_DIR}",
+    )
+    parser.add_argument(
+        "--vacuum-pages",
+        type=int,
+        default=None,
+        help="max number of free db pages to release, all by default",
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    main(
+        keep_days=args.keep_days,
+        archive_dir=EVENTS_ARCHIVE_DIR if args.archive else None,
+        vacuum_pages=args.vacuum_pages,
+    )
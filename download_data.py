@@ -1,5 +1,9 @@
+import argparse
 import logging
 import os
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import cast
 
 from dotenv import load_dotenv
 
@@ -8,72 +12,192 @@ from github_events_api.calculations import (
     load_events_data_into_df,
 )
 from github_events_api.configuation import (
+    RepositoryConfig,
     limit_number_of_repos,
     load_repository_config,
 )
-from github_events_api.constants import PERSONAL_TOKEN
+from github_events_api.constants import METRICS_FILENAME, PERSONAL_TOKEN
 from github_events_api.data_storage import (
+    Repository,
     create_db_and_tables,
     create_events,
-    create_repository,
-    create_statistics,
-    delete_statistics,
+    create_repositories,
+    create_statistics_history,
+    downsample_statistics_history,
     find_all_events,
-    find_repository_by_full_name,
-    update_repository_etag,
+    find_all_repositories,
+    replace_statistics,
+    update_repository_etags,
 )
 from github_events_api.github_api import get_github_events_per_repo, get_repository_info
+from github_events_api.metrics import STATISTICS_STAGE_SECONDS, write_metrics_file
+from github_events_api.profiling import StageProfiler
 
 log = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
 REPOS_THRESHOLD = 5
 REPOS_CONFIG = "repositories.yaml"
+PROFILE_DIR = "data/profile"
 
 
-def main():
-    logging.info("Starting the download process...")
-    create_db_and_tables()
+@contextmanager
+def _statistics_stage(name: str, profiler: StageProfiler):
+    with STATISTICS_STAGE_SECONDS.time(stage=name), profiler.stage(name):
+        yield
+
+
+def resolve_repositories(
+    repos: tuple[RepositoryConfig, ...], personal_token: str
+) -> dict[str, Repository]:
+    """
+    Get db records of configured repositories, keyed by configured full name.
+    All known repositories are loaded in one query; information about unknown ones is requested
+    from Github API and stored into db at once.
+    """
+    known_repos = find_all_repositories()
+    # repository listed more than once in the config is requested and stored only once
+    unknown_repos = list({r.full_name: r for r in repos if r.full_name not in known_repos}.values())
 
-    # access personal token for requests to Github API
-    load_dotenv(".env")
-    personal_token = os.getenv(PERSONAL_TOKEN)
+    repos_info = [get_repository_info(r, personal_token) for r in unknown_repos]
+    created_repos = create_repositories(repos_info) if repos_info else []
 
-    # get list of repositories to collect info about
-    config = load_repository_config(REPOS_CONFIG)
-    repos = limit_number_of_repos(config, REPOS_THRESHOLD)
+    return {
+        **known_repos,
+        **{r.full_name: c for r, c in zip(unknown_repos, created_repos, strict=True)},
+    }
 
+
+def download_events(
+    repos: tuple[RepositoryConfig, ...], personal_token: str, profiler: StageProfiler
+) -> None:
+    """Download repositories and their new events from Github API and store them into db."""
+    with profiler.stage("resolve_repositories"):
+        repo_records = resolve_repositories(repos, personal_token)
+
+    new_etags = {}
     for repo in repos:
-        # check if repo is already present in "repositories" db table
-        # if yes, get its etag to limit number of requests
-        repo_record = find_repository_by_full_name(repo.full_name)
-        if repo_record:
-            repo_id = repo_record.id
-            etag = repo_record.etag
-        # if no, request repo info from GH API and store it into Repository db table
-        else:
-            repo_info_response = get_repository_info(repo, personal_token)
-            etag = None
-            create_repository(repo_info_response, etag)
-            repo_id = repo_info_response["id"]
-
-        # download events for given repository
-        repo_events_response, new_etag = get_github_events_per_repo(repo, personal_token, etag)
-
-        # if there are any events, store them into db
-        if repo_events_response:
-            create_events(repo_events_response)
-            update_repository_etag(repo_id, new_etag)
-
-    # wipe Statistics db table before adding new calculations
-    delete_statistics()
-
-    # calculate statistics and save them into db
-    events = find_all_events()
-    events_df = load_events_data_into_df(events)
-    statistics = calculate_rolling_avg_time_diff_per_event_type(events_df)
-    create_statistics(statistics)
+        repo_record = repo_records[repo.full_name]
+        with profiler.stage(f"repository {repo.full_name}"):
+            new_etag = _download_repository_events(repo, personal_token, repo_record, profiler)
+        if new_etag:
+            new_etags[repo_record.id] = new_etag
+
+    # etags are stored after all events; if the run fails, already stored events are only
+    # downloaded again and skipped
+    with profiler.stage("update_repository_etags"):
+        update_repository_etags(new_etags)
+
+
+def _download_repository_events(
+    repo: RepositoryConfig,
+    personal_token: str,
+    repo_record: Repository,
+    profiler: StageProfiler,
+) -> str | None:
+    """
+    Download new events of given repository and store them into db.
+    Return etag of the events request, None if there are no new events.
+    """
+    # etag of the last request limits number of requests
+    with profiler.stage("get_github_events_per_repo"):
+        repo_events_response, new_etag = get_github_events_per_repo(
+            repo, personal_token, repo_record.etag
+        )
+
+    # if there are any events, store them into db
+    if repo_events_response:
+        # new events are added also into time difference quantile sketches
+        with profiler.stage("create_events"):
+            create_events(repo_events_response, profiler.stage)
+        return new_etag
+
+    return None
+
+
+def calculate_statistics(profiler: StageProfiler) -> None:
+    """Calculate statistics from all stored events and save them into db."""
+    with _statistics_stage("find_all_events", profiler):
+        events = find_all_events()
+    with _statistics_stage("load_events_data_into_df", profiler):
+        events_df = load_events_data_into_df(events)
+    with _statistics_stage("calculate_rolling_avg_time_diff", profiler):
+        statistics = calculate_rolling_avg_time_diff_per_event_type(events_df)
+    # stored in UTC
+    computed_at = datetime.now(timezone.utc).replace(tzinfo=None)
+    # new generation of statistics replaces the old one and notifies API subscribers
+    with _statistics_stage("replace_statistics", profiler):
+        replace_statistics(statistics, computed_at)
+
+    # keep snapshot of statistics as time series
+    with _statistics_stage("statistics_history", profiler):
+        create_statistics_history(statistics, computed_at)
+        downsample_statistics_history(computed_at)
+
+
+def main(profiler: StageProfiler | None = None):
+    logging.info("Starting the download process...")
+    # disabled profiler does not measure anything
+    profiler = profiler or StageProfiler()
+
+    with profiler:
+        with profiler.stage("create_db_and_tables"):
+            create_db_and_tables()
+
+        # access personal token for requests to Github API
+        load_dotenv(".env")
+        # missing token is left to fail on the first request, as before
+        personal_token = cast(str, os.getenv(PERSONAL_TOKEN))
+
+        # get list of repositories to collect info about
+        with profiler.stage("load_repository_config"):
+            config = load_repository_config(REPOS_CONFIG)
+            repos = limit_number_of_repos(config, REPOS_THRESHOLD)
+
+        try:
+            with profiler.stage("download_events"):
+                download_events(repos, personal_token, profiler)
+            with profiler.stage("calculate_statistics"):
+                calculate_statistics(profiler)
+        finally:
+            # metrics are written also for failed run, to see where it failed
+            write_metrics_file(METRICS_FILENAME)
+            log.info(f"Metrics written into {METRICS_FILENAME}.")
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Download events from Github API and calculate statistics."
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help=f"measure wall time and CPU time of each stage, write report into {PROFILE_DIR}",
+    )
+    parser.add_argument(
+        "--profile-memory",
+        action="store_true",
+        help="measure also peak memory of each stage by tracemalloc, implies --profile",
+    )
+    parser.add_argument(
+        "--profile-cprofile",
+        action="store_true",
+        help="dump cProfile data of the whole run for offline analysis, implies --profile",
+    )
+    parser.add_argument("--profile-dir", default=PROFILE_DIR, help="where to write profile")
+    args = parser.parse_args(argv)
+
+    args.profile = args.profile or args.profile_memory or args.profile_cprofile
+    return args
 
 
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    main(
+        StageProfiler(
+            enabled=args.profile,
+            output_dir=args.profile_dir,
+            trace_memory=args.profile_memory,
+            cprofile=args.profile_cprofile,
+        )
+    )
@@ -7,6 +7,8 @@ from github_events_api.constants import (
     EVENT_REPO_ID,
     EVENT_TIME_DIFF,
     EVENT_TYPE,
+    STATS_WINDOW_DAYS,
+    STATS_WINDOW_EVENTS,
 )
 from github_events_api.data_storage import Event
 
@@ -29,10 +31,10 @@ def _calculate_rolling_average_time_diff(events_group: pd.DataFrame) -> float:
     # select relevant events
     # either last 7 days or 500 events, which one is sooner
     last_date = events_group[EVENT_CREATED_AT].max()
-    start_date = last_date - pd.Timedelta(days=7)
+    start_date = last_date - pd.Timedelta(days=STATS_WINDOW_DAYS)
     date_mask = events_group[EVENT_CREATED_AT] >= start_date
 
-    eligible_events = events_group.loc[date_mask].head(500)
+    eligible_events = events_group.loc[date_mask].head(STATS_WINDOW_EVENTS)
     # get time difference between events
     eligible_events[EVENT_TIME_DIFF] = eligible_events[EVENT_CREATED_AT].diff()
 
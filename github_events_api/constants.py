@@ -2,6 +2,9 @@
 SQLITE_FILENAME = "data/sql_model.db"
 SQLITE_URL = f"sqlite:///{SQLITE_FILENAME}"
 
+# metrics of the last ingest run in Prometheus text format
+METRICS_FILENAME = "data/ingest_metrics.prom"
+
 # events parameters
 EVENT_TYPE = "type"
 EVENT_CREATED_AT = "created_at"
@@ -9,6 +12,21 @@ EVENT_REPO_ID = "repo_id"
 EVENT_TIME_DIFF = "time_diff"
 EVENT_AVG_TIME_DIFF = "avg_time_diff_secs"
 
+# statistics are calculated over last 7 days (from the latest event) or 500 events
+STATS_WINDOW_DAYS = 7
+STATS_WINDOW_EVENTS = 500
+# events pruned from db are archived into this folder
+EVENTS_ARCHIVE_DIR = "data/archive"
+
+# quantiles of time difference between events, name -> quantile
+TIME_DIFF_QUANTILES = {"p50": 0.5, "p90": 0.9, "p99": 0.99}
+
+# statistics history
+# all snapshots are kept for this number of days, older ones are downsampled to one per day
+STATS_HISTORY_FULL_RESOLUTION_DAYS = 7
+# snapshots older than this number of days are deleted
+STATS_HISTORY_RETENTION_DAYS = 365
+
 # repository parameters
 REPO_ID = "id"
 REPO_OWNER = "owner"
@@ -1,12 +1,24 @@
 import logging
-from datetime import datetime
-from typing import Sequence
-
-import pandas as pd
-from sqlalchemy import inspect
-from sqlmodel import Field, Session, SQLModel, create_engine, delete, select
-
-from github_events_api.constants import SQLITE_URL
+from contextlib import AbstractContextManager, nullcontext
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Callable, Sequence, cast
+
+from sqlalchemy import CursorResult, Index, UniqueConstraint, func, inspect, tuple_
+from sqlmodel import Field, Session, SQLModel, col, create_engine, delete, select, update
+
+from github_events_api.constants import (
+    SQLITE_URL,
+    STATS_HISTORY_FULL_RESOLUTION_DAYS,
+    STATS_HISTORY_RETENTION_DAYS,
+    STATS_WINDOW_DAYS,
+    TIME_DIFF_QUANTILES,
+)
+from github_events_api.metrics import CREATE_EVENTS_SECONDS, EVENTS_RECEIVED, EVENTS_STORED
+from github_events_api.sketches import QuantileSketch, calculate_inter_event_times
+
+# pandas is needed only by ingestion, API workers should not pay for its import
+if TYPE_CHECKING:
+    import pandas as pd
 
 engine = create_engine(SQLITE_URL, echo=False)
 
@@ -46,6 +58,9 @@ class Repository(SQLModel, table=True):
 
 
 class Event(SQLModel, table=True):
+    # statistics window of given repository and event type is selected by this index
+    __table_args__ = (Index("ix_event_repo_type_created_at", "repo_id", "type", "created_at"),)
+
     id: int = Field(primary_key=True)
     type: str = Field(nullable=False)
     actor_id: int = Field(nullable=False)
@@ -77,7 +92,7 @@ class Statistics(SQLModel, table=True):
     )
 
     @classmethod
-    def from_df(cls, data: pd.Series) -> "Statistics":
+    def from_df(cls, data: "pd.Series") -> "Statistics":
         return Statistics(
             repo_id=data["repo_id"],
             event_type=data["type"],
@@ -85,31 +100,177 @@ class Statistics(SQLModel, table=True):
         )
 
 
+class StatisticsHistory(SQLModel, table=True):
+    # range queries for given repository and event type are served from this index
+    __table_args__ = (
+        Index("ix_statisticshistory_repo_type_time", "repo_id", "event_type", "computed_at"),
+    )
+
+    id: int | None = Field(
+        default=None, primary_key=True, description="Unique ID for statistics snapshot."
+    )
+    repo_id: int = Field(
+        nullable=False, foreign_key="repository.id", description="ID of repository."
+    )
+    event_type: str = Field(nullable=False, description="Type of event, e.g. WatchEvent.")
+    computed_at: datetime = Field(nullable=False, description="When the statistics were computed.")
+    avg_time_diff_secs: float | None = Field(
+        nullable=True,
+        description="Avg time difference between events of same type and repository. In seconds.",
+    )
+
+    @classmethod
+    def from_df(cls, data: "pd.Series", computed_at: datetime) -> "StatisticsHistory":
+        return StatisticsHistory(
+            repo_id=data["repo_id"],
+            event_type=data["type"],
+            computed_at=computed_at,
+            avg_time_diff_secs=data["avg_time_diff_secs"],
+        )
+
+
+class StatisticsSketch(SQLModel, table=True):
+    __table_args__ = (UniqueConstraint("repo_id", "event_type"),)
+
+    id: int | None = Field(default=None, primary_key=True)
+    repo_id: int = Field(nullable=False, foreign_key="repository.id")
+    event_type: str = Field(nullable=False)
+    last_event_at: datetime
+    sketch: str = Field(nullable=False)
+
+    def to_sketch(self) -> QuantileSketch:
+        return QuantileSketch.from_json(self.sketch)
+
+    def to_quantiles(self) -> dict[str, float | None]:
+        """Get configured quantiles of time difference between events. In seconds."""
+        sketch = self.to_sketch()
+        return {name: sketch.quantile(q) for name, q in TIME_DIFF_QUANTILES.items()}
+
+
+class EventPruneWatermark(SQLModel, table=True):
+    __table_args__ = (UniqueConstraint("repo_id", "event_type"),)
+
+    id: int | None = Field(default=None, primary_key=True)
+    repo_id: int = Field(nullable=False, foreign_key="repository.id")
+    event_type: str = Field(nullable=False)
+    # events of given repository and type created before this time were pruned
+    pruned_before: datetime
+
+
+class StatisticsGeneration(SQLModel, table=True):
+    id: int | None = Field(default=None, primary_key=True)
+    created_at: datetime
+
+
 def create_db_and_tables():
     """Start SQLite db and create tables defined by SQLModel."""
+    # without full VACUUM, incremental vacuum can be enabled only before any table is created
+    with engine.connect() as connection:
+        connection.exec_driver_sql("PRAGMA auto_vacuum = INCREMENTAL")
     SQLModel.metadata.create_all(engine)
+    # create_all skips tables which already exist, including their new indexes
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
 
 
-def create_events(events_data: list[dict]) -> None:
-    """Store events into db 'Event' table."""
-    events = [Event.from_data(e) for e in events_data]
-    with Session(engine) as session:
-        count = 0
-        for e in events:
-            # verify that the event is not in the table already
-            statement = select(Event).where(Event.id == e.id)
-            results = session.exec(statement)
-            if results.first():
-                log.warn(f"Event with id={e.id} is already present in the database, skipping...")
-            else:
-                session.add(e)
-                count += 1
+def _update_statistics_sketches(session: Session, events: list[Event]) -> None:
+    """
+    Add time differences between newly ingested events into 'StatisticsSketch' db table.
+    Sketches are updated incrementally, so only new events should be passed, not the whole
+    history. Changes are committed by the caller.
+    """
+    timestamps: dict[tuple[int, str], list[datetime]] = {}
+    for e in events:
+        timestamps.setdefault((e.repo_id, e.type), []).append(e.created_at)
 
-        log.info(
-            f"Adding {count} new events for repository {e.repo_id} into db. "
-            f"Originally got {len(events)} in request to Github API."
+    for (repo_id, event_type), created_at in timestamps.items():
+        statement = select(StatisticsSketch).where(
+            StatisticsSketch.repo_id == repo_id, StatisticsSketch.event_type == event_type
         )
-        session.commit()
+        record = session.exec(statement).first()
+
+        if record is None:
+            sketch = QuantileSketch()
+            record = StatisticsSketch(
+                repo_id=repo_id,
+                event_type=event_type,
+                last_event_at=max(created_at),
+                sketch=sketch.to_json(),
+            )
+            last_event_at = None
+        else:
+            sketch = record.to_sketch()
+            last_event_at = record.last_event_at
+
+        for time_diff in calculate_inter_event_times(created_at, last_event_at):
+            sketch.add(time_diff)
+
+        record.sketch = sketch.to_json()
+        record.last_event_at = max([record.last_event_at, *created_at])
+        session.add(record)
+
+    log.info(f"Updated {len(timestamps)} time difference sketches.")
+
+
+def _no_stage(name: str) -> AbstractContextManager[None]:
+    return nullcontext()
+
+
+def create_events(
+    events_data: list[dict], stage: Callable[[str], AbstractContextManager[None]] = _no_stage
+) -> list[Event]:
+    """
+    Store events into db 'Event' table and add them into time difference sketches.
+    Return list of events which were not present in the table before.
+    Events older than prune watermark of their repository and type are skipped, as Github API
+    returns also events which were already pruned from db.
+    "stage" wraps each part of the work, e.g. to profile it by `StageProfiler.stage`.
+    """
+    events = [Event.from_data(e) for e in events_data]
+    new_events = []
+    with CREATE_EVENTS_SECONDS.time(), Session(engine, expire_on_commit=False) as session:
+        with stage("store_events"):
+            watermarks_statement = select(EventPruneWatermark).where(
+                col(EventPruneWatermark.repo_id).in_({e.repo_id for e in events})
+            )
+            watermarks = {
+                (w.repo_id, w.event_type): w.pruned_before
+                for w in session.exec(watermarks_statement)
+            }
+
+            for e in events:
+                pruned_before = watermarks.get((e.repo_id, e.type))
+                if pruned_before is not None and e.created_at < pruned_before:
+                    log.debug(f"Event with id={e.id} was already pruned, skipping...")
+                    continue
+                # verify that the event is not in the table already
+                statement = select(Event).where(Event.id == e.id)
+                results = session.exec(statement)
+                if results.first():
+                    log.warn(
+                        f"Event with id={e.id} is already present in the database, skipping..."
+                    )
+                else:
+                    session.add(e)
+                    new_events.append(e)
+
+            log.info(
+                f"Adding {len(new_events)} new events for repository {e.repo_id} into db. "
+                f"Originally got {len(events)} in request to Github API."
+            )
+            # write events now, not by autoflush of the sketches stage
+            session.flush()
+        # in one transaction with the events; stored events are not new in the next run, so
+        # events stored without sketch update would never get into the sketches
+        with stage("update_statistics_sketches"):
+            _update_statistics_sketches(session, new_events)
+        with stage("commit"):
+            session.commit()
+
+    EVENTS_RECEIVED.inc(len(events))
+    EVENTS_STORED.inc(len(new_events))
+    return new_events
 
 
 def create_repository(repo_data: dict, etag: str | None) -> None:
@@ -122,14 +283,47 @@ def create_repository(repo_data: dict, etag: str | None) -> None:
         session.commit()
 
 
-def create_statistics(data: pd.DataFrame) -> None:
-    """Store statistics into 'Statistics' db table."""
-    stats = [Statistics.from_df(s) for _, s in data.iterrows()]
+def create_repositories(repos_data: list[dict]) -> list[Repository]:
+    """Store information about many repositories into 'Repository' table in one transaction."""
+    repositories = [Repository.from_data(r, None) for r in repos_data]
+
+    with Session(engine, expire_on_commit=False) as session:
+        session.add_all(repositories)
+        session.commit()
+
+    log.info(f"Added {len(repositories)} new repositories into db.")
+    return repositories
+
+
+def create_statistics_history(data: "pd.DataFrame", computed_at: datetime) -> None:
+    """Store snapshot of statistics into 'StatisticsHistory' db table."""
+    snapshots = [StatisticsHistory.from_df(s, computed_at) for _, s in data.iterrows()]
     with Session(engine) as session:
-        for stat in stats:
-            session.add(stat)
+        session.add_all(snapshots)
+        session.commit()
+
+
+def replace_statistics(data: "pd.DataFrame", created_at: datetime) -> int:
+    """
+    Replace all records of 'Statistics' db table by new statistics and mark them as new
+    statistics generation, so that API subscribers can be notified. Everything is done in one
+    transaction, so readers see either the old or the new generation, never a mix of them.
+    Return id of the new generation.
+    """
+    stats = [Statistics.from_df(s) for _, s in data.iterrows()]
+    generation = StatisticsGeneration(created_at=created_at)
+    with Session(engine, expire_on_commit=False) as session:
+        deleted = cast(CursorResult, session.execute(delete(Statistics)))
+        session.add_all(stats)
+        session.add(generation)
         session.commit()
 
+    log.info(
+        f"Replaced {deleted.rowcount} records of Statistics db table by {len(stats)} new ones, "
+        f"statistics generation {generation.id}."
+    )
+    return cast(int, generation.id)
+
 
 def find_repository_by_full_name(repo_full_name: str) -> Repository | None:
     """
@@ -158,6 +352,26 @@ def find_repository_by_full_name(repo_full_name: str) -> Repository | None:
         return repository
 
 
+def find_all_repositories() -> dict[str, Repository]:
+    """Get all repositories from 'Repository' table keyed by their full name."""
+    with Session(engine) as session:
+        results = session.exec(select(Repository))
+
+        return {r.full_name: r for r in results}
+
+
+def find_repositories_by_full_names(repo_full_names: list[str]) -> dict[str, Repository]:
+    """
+    Get repositories from 'Repository' table for all given full names in one query.
+    Return dictionary with full name as key; repositories which are not found are left out.
+    """
+    with Session(engine) as session:
+        statement = select(Repository).where(col(Repository.full_name).in_(set(repo_full_names)))
+        results = session.exec(statement)
+
+        return {r.full_name: r for r in results}
+
+
 def find_repository_by_owner(repo_owner: str) -> Sequence[Repository] | None:
     """
     Get list of repositories based on their owner.
@@ -199,6 +413,35 @@ def find_all_events() -> list[Event]:
         return list(result.all())
 
 
+def find_event_window_starts(
+    window_days: int = STATS_WINDOW_DAYS,
+) -> dict[tuple[int, str], datetime]:
+    """
+    Get start of statistics window for each repository id and event type, i.e. time of the
+    latest event minus "window_days". Events older than that can no longer affect statistics,
+    as the latest event only moves forward.
+    """
+    with Session(engine) as session:
+        statement = select(Event.repo_id, Event.type, func.max(Event.created_at)).group_by(
+            col(Event.repo_id), col(Event.type)
+        )
+        results = session.exec(statement)
+
+        return {
+            (repo_id, event_type): latest - timedelta(days=window_days)
+            for repo_id, event_type, latest in results
+        }
+
+
+def find_events_before(repo_id: int, event_type: str, before: datetime) -> list[Event]:
+    """Get events of given repository and type which happened before given time."""
+    with Session(engine) as session:
+        statement = select(Event).where(
+            Event.repo_id == repo_id, Event.type == event_type, col(Event.created_at) < before
+        )
+        return list(session.exec(statement).all())
+
+
 def find_all_stats() -> list[Statistics]:
     """Get list of statistics stored in 'Statistics' db table."""
     with Session(engine) as session:
@@ -207,6 +450,49 @@ def find_all_stats() -> list[Statistics]:
         return list(result.all())
 
 
+def find_stats_page(after_id: int | None, limit: int) -> tuple[int | None, list[dict]]:
+    """
+    Get one page of statistics ordered by id, starting after "after_id" (keyset pagination),
+    together with id of statistics generation they belong to. Ids are valid only within one
+    generation, as each generation replaces all statistics.
+    Rows are returned as plain dictionaries, so they can be serialized without building and
+    validating model instances.
+    """
+    with Session(engine) as session:
+        # pysqlite does not begin transaction for reads; without it, new generation could be
+        # committed between reading the generation and the page
+        session.connection().exec_driver_sql("BEGIN")
+        generation = _find_latest_statistics_generation(session)
+
+        statement = select(
+            Statistics.id,
+            Statistics.repo_id,
+            Statistics.event_type,
+            Statistics.avg_time_diff_secs,
+        )
+        if after_id is not None:
+            statement = statement.where(col(Statistics.id) > after_id)
+        statement = statement.order_by(col(Statistics.id)).limit(limit)
+
+        columns = ("id", "repo_id", "event_type", "avg_time_diff_secs")
+        return generation, [dict(zip(columns, row, strict=True)) for row in session.exec(statement)]
+
+
+def _find_latest_statistics_generation(session: Session) -> int | None:
+    # db created before generations were introduced gets the table by the next ingestion
+    if not inspect(session.connection()).has_table("statisticsgeneration"):
+        return None
+
+    statement = select(func.max(StatisticsGeneration.id))
+    return session.exec(statement).one()
+
+
+def find_latest_statistics_generation() -> int | None:
+    """Get id of the latest statistics generation. Return None if there is none yet."""
+    with Session(engine) as session:
+        return _find_latest_statistics_generation(session)
+
+
 def find_stats_by_params(repo_owner: str, repo_name: str, event_type: str) -> list[Statistics]:
     """
     Get filtered list of statistics from 'Statistics' db table.
@@ -234,24 +520,221 @@ def find_stats_by_params(repo_owner: str, repo_name: str, event_type: str) -> li
     return event_stats
 
 
-def update_repository_etag(repo_id: int, new_etag: str) -> None:
+def find_time_diff_quantiles(
+    repo_owner: str, repo_name: str, event_type: str
+) -> dict[str, float | None] | None:
+    """
+    Get quantiles of time difference between events of given type and repository.
+    Return None if there is no sketch for given parameters.
+    """
+    with Session(engine) as session:
+        statement = (
+            select(StatisticsSketch)
+            .join(Repository)
+            .where(
+                Repository.full_name == f"{repo_owner}/{repo_name}",
+                StatisticsSketch.event_type == event_type,
+            )
+        )
+        record = session.exec(statement).first()
+
+        if record is None:
+            return None
+
+        return record.to_quantiles()
+
+
+def find_stats_by_repo_ids_and_types(keys: list[tuple[int, str]]) -> list[Statistics]:
+    """Get statistics for all given pairs of repository id and event type in one query."""
+    with Session(engine) as session:
+        statement = select(Statistics).where(
+            tuple_(col(Statistics.repo_id), col(Statistics.event_type)).in_(set(keys))
+        )
+        result = session.exec(statement)
+        return list(result.all())
+
+
+def find_sketches_by_repo_ids_and_types(keys: list[tuple[int, str]]) -> list[StatisticsSketch]:
+    """Get time difference sketches for all given pairs of repository id and event type."""
+    with Session(engine) as session:
+        statement = select(StatisticsSketch).where(
+            tuple_(col(StatisticsSketch.repo_id), col(StatisticsSketch.event_type)).in_(set(keys))
+        )
+        result = session.exec(statement)
+        return list(result.all())
+
+
+def _to_naive_utc(value: datetime) -> datetime:
+    """Convert timezone aware datetime to naive UTC, as datetimes are stored in db."""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def find_statistics_history(
+    repo_owner: str, repo_name: str, event_type: str, start: datetime, end: datetime
+) -> list[StatisticsHistory]:
+    """
+    Get statistics snapshots for given repository and event type computed between "start" and
+    "end" (both inclusive), ordered by computation time.
+    Naive "start" and "end" are in UTC.
     """
-    Update etag for repository based on the latest request to Github Events API.
-    More info in
+    start, end = _to_naive_utc(start), _to_naive_utc(end)
+    # filter by repository id, so that the range is searched in the composite index
+    repository = find_repository_by_full_name(f"{repo_owner}/{repo_name}")
+    if repository is None:
+        return []
+
+    with Session(engine) as session:
+        statement = (
+            select(StatisticsHistory)
+            .where(
+                StatisticsHistory.repo_id == repository.id,
+                StatisticsHistory.event_type == event_type,
+                StatisticsHistory.computed_at >= start,
+                StatisticsHistory.computed_at <= end,
+            )
+            .order_by(col(StatisticsHistory.computed_at))
+        )
+        result = session.exec(statement)
+        return list(result.all())
+
+
+def update_repository_etags(etags: dict[int, str]) -> None:
+    """
+    Update etags of many repositories, keyed by repository id, in one batched statement.
+    Etag of the latest request to Github Events API is sent with the next request, which then
+    returns no events if nothing has changed. More info in
     https://docs.github.com/en/rest/activity/events?apiVersion=2022-11-28#about-github-events
     """
+    if not etags:
+        return
+
     with Session(engine) as session:
-        statement = select(Repository).where(Repository.id == repo_id)
-        results = session.exec(statement)
-        repository = results.one()
-        repository.etag = new_etag
-        session.add(repository)
+        session.execute(
+            update(Repository), [{"id": repo_id, "etag": etag} for repo_id, etag in etags.items()]
+        )
         session.commit()
 
+    log.info(f"Updated etags of {len(etags)} repositories.")
+
 
-def delete_statistics():
-    """Delete records from Statistics table."""
+def delete_events_before(window_starts: dict[tuple[int, str], datetime]) -> int:
+    """
+    Delete events which happened before given time for each repository id and event type.
+    The time is kept as prune watermark, so that deleted events are not stored again by later
+    ingestion. Return number of deleted events.
+    """
+    deleted = 0
     with Session(engine) as session:
-        results = session.exec(delete(Statistics))
+        statement = select(EventPruneWatermark)
+        watermarks = {(w.repo_id, w.event_type): w for w in session.exec(statement)}
+
+        for (repo_id, event_type), before in window_starts.items():
+            watermark = watermarks.get((repo_id, event_type))
+            if watermark is None:
+                watermark = EventPruneWatermark(
+                    repo_id=repo_id, event_type=event_type, pruned_before=before
+                )
+            # later run with more "keep_days" must not let already pruned events back
+            watermark.pruned_before = max(watermark.pruned_before, before)
+            session.add(watermark)
+
+            result = cast(
+                CursorResult,
+                session.execute(
+                    delete(Event).where(
+                        col(Event.repo_id) == repo_id,
+                        col(Event.type) == event_type,
+                        col(Event.created_at) < before,
+                    )
+                ),
+            )
+            deleted += result.rowcount
         session.commit()
-        log.info(f"Deleted {results.rowcount} records from Statistics db table.")
+
+    log.info(f"Deleted {deleted} records from Event db table.")
+    return deleted
+
+
+def vacuum_database(pages: int | None = None) -> None:
+    """
+    Return free pages of SQLite db file to the file system by incremental vacuum.
+    If "pages" is None, all free pages are returned.
+    Incremental vacuum has to be enabled for the db, which needs one full VACUUM of existing db.
+    """
+    # VACUUM can not run inside transaction
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        auto_vacuum = connection.exec_driver_sql("PRAGMA auto_vacuum").scalar()
+        # 2 == INCREMENTAL
+        if auto_vacuum != 2:
+            log.info("Enabling incremental vacuum, running full VACUUM of the db...")
+            connection.exec_driver_sql("PRAGMA auto_vacuum = INCREMENTAL")
+            connection.exec_driver_sql("VACUUM")
+
+        free_pages = connection.exec_driver_sql("PRAGMA freelist_count").scalar_one()
+        # sqlite3 "execute" steps the pragma only once, which releases single page;
+        # "executescript" runs it to completion
+        connection.connection.driver_connection.executescript(  # type: ignore[union-attr]
+            "PRAGMA incremental_vacuum;"
+            if pages is None
+            else f"PRAGMA incremental_vacuum({pages});"
+        )
+        remaining = connection.exec_driver_sql("PRAGMA freelist_count").scalar_one()
+
+    log.info(f"Vacuum released {free_pages - remaining} of {free_pages} free db pages.")
+
+
+def downsample_statistics_history(
+    now: datetime,
+    full_resolution_days: int = STATS_HISTORY_FULL_RESOLUTION_DAYS,
+    retention_days: int = STATS_HISTORY_RETENTION_DAYS,
+) -> None:
+    """
+    Limit size of 'StatisticsHistory' db table.
+    Snapshots older than "retention_days" are deleted. Snapshots older than "full_resolution_days"
+    are downsampled to the latest snapshot of each day for given repository and event type.
+    """
+    retention_start = now - timedelta(days=retention_days)
+    full_resolution_start = now - timedelta(days=full_resolution_days)
+
+    with Session(engine) as session:
+        expired = cast(
+            CursorResult,
+            session.execute(
+                delete(StatisticsHistory).where(
+                    col(StatisticsHistory.computed_at) < retention_start
+                )
+            ),
+        )
+
+        statement = (
+            select(
+                StatisticsHistory.id,
+                StatisticsHistory.repo_id,
+                StatisticsHistory.event_type,
+                StatisticsHistory.computed_at,
+            )
+            .where(StatisticsHistory.computed_at < full_resolution_start)
+            .order_by(col(StatisticsHistory.computed_at).desc())
+        )
+        # rows are ordered from the newest, so the first one of each day is kept
+        kept_days = set()
+        redundant_ids = []
+        for snapshot_id, repo_id, event_type, computed_at in session.exec(statement):
+            day = (repo_id, event_type, computed_at.date())
+            if day in kept_days:
+                redundant_ids.append(snapshot_id)
+            else:
+                kept_days.add(day)
+
+        if redundant_ids:
+            session.execute(
+                delete(StatisticsHistory).where(col(StatisticsHistory.id).in_(redundant_ids))
+            )
+        session.commit()
+
+        log.info(
+            f"Deleted {expired.rowcount} expired and {len(redundant_ids)} downsampled records "
+            "from StatisticsHistory db table."
+        )
@@ -1,10 +1,16 @@
 import logging
 import re
+import time
 
 import requests
 from requests.adapters import HTTPAdapter, Retry
 
 from github_events_api.configuation import RepositoryConfig
+from github_events_api.metrics import (
+    GITHUB_RATE_LIMIT_REMAINING,
+    GITHUB_REQUEST_RETRIES,
+    GITHUB_REQUEST_SECONDS,
+)
 
 log = logging.getLogger(__name__)
 
@@ -13,6 +19,8 @@ GITHUB_API_REPOS_URL = f"{GITHUB_API_URL}/repos"
 
 # Github API has default 30, max limit 100
 PER_PAGE_EVENTS = 100
+# max number of retries of failed request
+MAX_RETRIES = 4
 
 
 def _transform_etag(etag_str: str) -> str | None:
@@ -26,7 +34,7 @@ def _transform_etag(etag_str: str) -> str | None:
 def _retry_request(url: str, headers: dict, params: dict) -> requests.Response:
     """Rerun GET request to given url if failed with specified errors."""
     retry_strategy = Retry(
-        total=4,  # max number of retries
+        total=MAX_RETRIES,
         status_forcelist=[429, 500, 502, 503, 504],
     )
 
@@ -36,11 +44,40 @@ def _retry_request(url: str, headers: dict, params: dict) -> requests.Response:
     session.mount("https://", adapter)
 
     # send request using the session object
-    response = session.get(url=url, headers=headers, params=params)
+    start = time.perf_counter()
+    try:
+        response = session.get(url=url, headers=headers, params=params)
+    except requests.exceptions.RetryError:
+        # urllib3 gave up after all retries, so there is no response to record
+        _record_request_metrics(url, None, time.perf_counter() - start, MAX_RETRIES)
+        raise
+
+    # urllib3 keeps history of retried requests on the response
+    retries = getattr(getattr(response.raw, "retries", None), "history", None) or ()
+    _record_request_metrics(url, response, time.perf_counter() - start, len(retries))
 
     return response
 
 
+def _record_request_metrics(
+    url: str, response: requests.Response | None, seconds: float, retries: int
+) -> None:
+    """Record metrics of request to Github API; "response" is None if retries ran out."""
+    endpoint = "events" if url.endswith("/events") else "repository"
+    status = response.status_code if response is not None else "retries_exhausted"
+    GITHUB_REQUEST_SECONDS.observe(seconds, endpoint=endpoint, status=status)
+
+    if retries:
+        GITHUB_REQUEST_RETRIES.inc(retries, endpoint=endpoint)
+
+    if response is None:
+        return
+
+    rate_limit_remaining = response.headers.get("X-RateLimit-Remaining")
+    if rate_limit_remaining is not None:
+        GITHUB_RATE_LIMIT_REMAINING.set(int(rate_limit_remaining))
+
+
 def get_github_events_per_repo(
     repository: RepositoryConfig, personal_token: str, last_etag: str | None
 ) -> tuple[list[dict] | None, str | None]:
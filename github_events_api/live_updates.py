@@ -0,0 +1,109 @@
+import asyncio
+import logging
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from github_events_api.data_storage import find_latest_statistics_generation, find_stats_page
+
+log = logging.getLogger(__name__)
+
+# how often the db is checked for new statistics generation
+LIVE_UPDATES_POLL_INTERVAL_SECS = 5.0
+# max number of not yet sent updates per subscriber, further updates are dropped
+LIVE_UPDATES_QUEUE_SIZE = 100
+# number of statistics records loaded from db in one query
+STATS_LOAD_PAGE_SIZE = 1000
+
+
+def _load_statistics() -> tuple[int | None, dict[tuple[int, str], dict]]:
+    """
+    Get all statistics records keyed by repository id and event type, together with their
+    generation. Loading starts again if new generation is committed in between pages.
+    """
+    while True:
+        generation, page = find_stats_page(after_id=None, limit=STATS_LOAD_PAGE_SIZE)
+        stats = {}
+        while page:
+            for s in page:
+                stats[(s["repo_id"], s["event_type"])] = s
+            page_generation, page = find_stats_page(
+                after_id=page[-1]["id"], limit=STATS_LOAD_PAGE_SIZE
+            )
+            if page_generation != generation:
+                log.info("New statistics generation was committed while loading, loading again.")
+                break
+        else:
+            return generation, stats
+
+
+class StatisticsBroadcaster:
+    """
+    Push changed statistics to subscribed clients.
+    Single poller checks the db for a new statistics generation committed by ingestion, so the
+    db is queried once per interval regardless of number of subscribers.
+    """
+
+    def __init__(self, poll_interval_secs: float = LIVE_UPDATES_POLL_INTERVAL_SECS):
+        self.poll_interval_secs = poll_interval_secs
+        self._subscribers: set[asyncio.Queue] = set()
+        # whether the first check already ran, i.e. "_stats" are baseline for next changes
+        self._loaded = False
+        self._generation: int | None = None
+        self._stats: dict[tuple[int, str], dict] = {}
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=LIVE_UPDATES_QUEUE_SIZE)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self._subscribers.discard(queue)
+
+    def check_for_changes(self) -> list[dict]:
+        """
+        Get statistics records which changed since the last known generation.
+        The first call only loads current statistics and returns empty list. If there was no
+        generation at that time, all records of the first generation are changed.
+        """
+        generation = find_latest_statistics_generation()
+        if generation == self._generation:
+            self._loaded = True
+            return []
+
+        # newer generation than the checked one can be loaded
+        generation, stats = _load_statistics()
+        changed = []
+        if self._loaded:
+            changed = [
+                s
+                for key, s in stats.items()
+                if key not in self._stats
+                or self._stats[key]["avg_time_diff_secs"] != s["avg_time_diff_secs"]
+            ]
+
+        self._loaded = True
+        self._generation = generation
+        self._stats = stats
+        log.info(f"Statistics generation {generation} has {len(changed)} changed records.")
+        return changed
+
+    def publish(self, changed: list[dict]) -> None:
+        for queue in self._subscribers:
+            try:
+                queue.put_nowait(changed)
+            except asyncio.QueueFull:
+                log.warning("Subscriber is not reading live updates, dropping statistics update.")
+
+    async def run(self) -> None:
+        """Poll the db for new statistics generation until cancelled."""
+        while True:
+            try:
+                changed = await asyncio.to_thread(self.check_for_changes)
+            except SQLAlchemyError as e:
+                log.error(f"Checking for new statistics failed: {e}.")
+                changed = []
+
+            if changed:
+                self.publish(changed)
+
+            await asyncio.sleep(self.poll_interval_secs)
@@ -0,0 +1,168 @@
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Iterator
+
+# upper bounds of histogram buckets, in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+REGISTRY: list["_Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class _Metric(ABC):
+    type = ""
+
+    def __init__(self, name: str, description: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: dict[str, object]) -> tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Metric {self.name} expects labels {self.labelnames}, got {labels}.")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    @abstractmethod
+    def _samples(self) -> list[tuple[str, dict[str, str], float]]:
+        """Get name, labels and value of each sample; called with the lock held."""
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.type}"]
+        with self._lock:
+            samples = self._samples()
+        lines.extend(f"{n}{_format_labels(lbl)} {_format_value(v)}" for n, lbl, v in samples)
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def __init__(self, name: str, description: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, description, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, value: float = 1, **labels: object) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def _samples(self) -> list[tuple[str, dict[str, str], float]]:
+        return [
+            (self.name, dict(zip(self.labelnames, k, strict=True)), v)
+            for k, v in self._values.items()
+        ]
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def set(self, value: float, **labels: object) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, description, labelnames)
+        self.buckets = (*sorted(buckets), math.inf)
+        # per labels: counts of observations in each bucket, sum of observed values
+        self._counts: dict[tuple[str, ...], list[int]] = {}
+        self._sums: dict[tuple[str, ...], float] = {}
+
+    def observe(self, value: float, **labels: object) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * len(self.buckets))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._sums[key] = self._sums.get(key, 0) + value
+
+    @contextmanager
+    def time(self, **labels: object) -> Iterator[None]:
+        """Observe wall time of the code block in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self) -> list[tuple[str, dict[str, str], float]]:
+        samples: list[tuple[str, dict[str, str], float]] = []
+        for key, counts in self._counts.items():
+            labels = dict(zip(self.labelnames, key, strict=True))
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts, strict=True):
+                cumulative += count
+                samples.append(
+                    (f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative)
+                )
+            samples.append((f"{self.name}_sum", labels, self._sums[key]))
+            samples.append((f"{self.name}_count", labels, cumulative))
+        return samples
+
+
+def render_metrics() -> str:
+    """Get all metrics in Prometheus text exposition format."""
+    return "\n".join(m.render() for m in REGISTRY) + "\n"
+
+
+def write_metrics_file(file_path: str) -> None:
+    """Write all metrics into file, e.g. for node exporter textfile collector."""
+    with open(file_path, "w") as f:
+        f.write(render_metrics())
+
+
+# Github API
+GITHUB_REQUEST_SECONDS = Histogram(
+    "github_request_seconds", "Latency of requests to Github API.", ("endpoint", "status")
+)
+GITHUB_REQUEST_RETRIES = Counter(
+    "github_request_retries_total", "Number of retried requests to Github API.", ("endpoint",)
+)
+GITHUB_RATE_LIMIT_REMAINING = Gauge(
+    "github_rate_limit_remaining", "Remaining number of requests to Github API in rate limit."
+)
+
+# ingestion
+CREATE_EVENTS_SECONDS = Histogram("create_events_seconds", "Time to store one batch of events.")
+EVENTS_RECEIVED = Counter("events_received_total", "Number of events received from Github API.")
+EVENTS_STORED = Counter("events_stored_total", "Number of new events stored into db.")
+STATISTICS_STAGE_SECONDS = Histogram(
+    "statistics_stage_seconds", "Time of each statistics calculation stage.", ("stage",)
+)
+
+# API
+API_REQUEST_SECONDS = Histogram(
+    "api_request_seconds", "Latency of API endpoints.", ("method", "path", "status")
+)
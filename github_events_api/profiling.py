@@ -0,0 +1,117 @@
+import cProfile
+import json
+import logging
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+log = logging.getLogger(__name__)
+
+REPORT_FILENAME = "report.json"
+CPROFILE_FILENAME = "profile.prof"
+
+
+class StageProfiler:
+    """
+    Measure wall time, CPU time and optionally peak memory of named stages of a run.
+    Stages can be nested. Use profiler as context manager around the whole run; on exit, it
+    writes report of all stages and optionally cProfile data for offline analysis
+    (e.g. `snakeviz` or `flameprof`) into "output_dir".
+    Disabled profiler only runs the code.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        output_dir: str | None = None,
+        trace_memory: bool = False,
+        cprofile: bool = False,
+    ):
+        self.enabled = enabled
+        self.output_dir = Path(output_dir) if output_dir else None
+        self.trace_memory = trace_memory
+        self.cprofile = cprofile
+        self.stages: list[dict] = []
+        # peak memory of currently open stages, tracemalloc peak is reset at each stage start
+        self._open_peaks: list[int] = []
+        self._depth = 0
+        self._profile: cProfile.Profile | None = None
+
+    def __enter__(self) -> "StageProfiler":
+        if self.enabled:
+            if self.trace_memory:
+                tracemalloc.start()
+            if self.cprofile:
+                self._profile = cProfile.Profile()
+                self._profile.enable()
+        return self
+
+    def __exit__(self, *args) -> None:
+        if not self.enabled:
+            return
+        if self._profile is not None:
+            self._profile.disable()
+        if self.trace_memory:
+            tracemalloc.stop()
+        if self.output_dir is not None:
+            self.write_report()
+        log.info(f"Profile of stages:\n{self.format_report()}")
+
+    def _fold_peak(self) -> None:
+        """Propagate peak since last reset into all open stages and reset it."""
+        _, peak = tracemalloc.get_traced_memory()
+        self._open_peaks = [max(p, peak) for p in self._open_peaks]
+        tracemalloc.reset_peak()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+
+        # stages are reported in order they started
+        record: dict = {"stage": name, "depth": self._depth, "peak_memory_bytes": None}
+        self.stages.append(record)
+        self._depth += 1
+        if self.trace_memory:
+            self._fold_peak()
+            self._open_peaks.append(0)
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            record["wall_secs"] = time.perf_counter() - wall_start
+            record["cpu_secs"] = time.process_time() - cpu_start
+            if self.trace_memory:
+                self._fold_peak()
+                record["peak_memory_bytes"] = self._open_peaks.pop()
+            self._depth -= 1
+
+    def format_report(self) -> str:
+        lines = [f"{'stage':<50} {'wall [s]':>10} {'cpu [s]':>10} {'peak [MiB]':>11}"]
+        for s in self.stages:
+            peak = s["peak_memory_bytes"]
+            peak_mib = f"{peak / 2**20:.2f}" if peak is not None else "-"
+            stage = "  " * s["depth"] + s["stage"]
+            lines.append(
+                f"{stage:<50} {s['wall_secs']:>10.3f} {s['cpu_secs']:>10.3f} {peak_mib:>11}"
+            )
+        return "\n".join(lines)
+
+    def write_report(self) -> None:
+        """Write stages report and cProfile data into output directory."""
+        assert self.output_dir is not None
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+
+        report_path = self.output_dir / REPORT_FILENAME
+        with open(report_path, "w") as f:
+            json.dump({"stages": self.stages}, f, indent=2)
+        log.info(f"Profile report written into {report_path}.")
+
+        if self._profile is not None:
+            profile_path = self.output_dir / CPROFILE_FILENAME
+            self._profile.dump_stats(profile_path)
+            log.info(f"cProfile data written into {profile_path}.")
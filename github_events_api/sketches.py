@@ -0,0 +1,107 @@
+import json
+import math
+from datetime import datetime
+
+# relative error guaranteed for every returned quantile value
+SKETCH_RELATIVE_ACCURACY = 0.01
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch with relative accuracy guarantee (DDSketch-like).
+    Positive values are counted in logarithmically sized buckets, zeros are counted separately.
+    Two sketches with the same accuracy can be merged without loss, which allows to update them
+    incrementally from newly ingested events only.
+    """
+
+    def __init__(self, relative_accuracy: float = SKETCH_RELATIVE_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.bins: dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def _key(self, value: float) -> int:
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def _value(self, key: int) -> float:
+        return 2 * self._gamma**key / (self._gamma + 1)
+
+    def add(self, value: float) -> None:
+        """Add single non-negative value into the sketch."""
+        if value < 0:
+            raise ValueError(f"Sketch accepts only non-negative values, got {value}.")
+        if value == 0:
+            self.zero_count += 1
+        else:
+            key = self._key(value)
+            self.bins[key] = self.bins.get(key, 0) + 1
+        self.count += 1
+
+    def merge(self, other: "QuantileSketch") -> None:
+        """Merge other sketch into this one."""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Only sketches with the same relative accuracy can be merged.")
+        for key, count in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+
+    def quantile(self, q: float) -> float | None:
+        """Get approximate value of given quantile. Return None for empty sketch."""
+        if not 0 <= q <= 1:
+            raise ValueError(f"Quantile has to be between 0 and 1, got {q}.")
+        if self.count == 0:
+            return None
+
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return 0.0
+
+        cumulative = self.zero_count
+        for key in sorted(self.bins):
+            cumulative += self.bins[key]
+            if cumulative > rank:
+                return self._value(key)
+
+        return self._value(max(self.bins))
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                "relative_accuracy": self.relative_accuracy,
+                "zero_count": self.zero_count,
+                "count": self.count,
+                "bins": self.bins,
+            }
+        )
+
+    @classmethod
+    def from_json(cls, data: str) -> "QuantileSketch":
+        values = json.loads(data)
+        sketch = cls(relative_accuracy=values["relative_accuracy"])
+        sketch.zero_count = values["zero_count"]
+        sketch.count = values["count"]
+        # json stores dict keys as strings
+        sketch.bins = {int(k): v for k, v in values["bins"].items()}
+        return sketch
+
+
+def calculate_inter_event_times(
+    timestamps: list[datetime], last_event_at: datetime | None
+) -> list[float]:
+    """
+    Get time differences in seconds between following events.
+    "last_event_at" is time of the latest event already counted in the sketch, so the first
+    difference is calculated from it. Events older than "last_event_at" are skipped, as they
+    would split a time difference which is already stored in the sketch.
+    """
+    timestamps = sorted(timestamps)
+    if last_event_at is not None:
+        timestamps = [last_event_at] + [t for t in timestamps if t >= last_event_at]
+
+    return [
+        (later - earlier).total_seconds()
+        for earlier, later in zip(timestamps, timestamps[1:], strict=False)
+    ]
@@ -0,0 +1,40 @@
+import pytest
+
+from benchmarks.github_stub import GithubStubServer
+from benchmarks.synthetic import generate_dataset, generate_events
+from github_events_api import github_api
+from github_events_api.configuation import RepositoryConfig
+
+test_repo_config = RepositoryConfig(owner="owner-0", name="repo-0")
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    with GithubStubServer(generate_dataset(n_repos=1, n_events_per_repo=250)) as server:
+        monkeypatch.setattr(github_api, "GITHUB_API_REPOS_URL", f"{server.url}/repos")
+        yield server
+
+
+def test_get_repository_info(stub):
+    result = github_api.get_repository_info(test_repo_config, "token")
+
+    assert result["full_name"] == "owner-0/repo-0"
+
+
+def test_get_github_events_per_repo_pagination(stub):
+    result, etag = github_api.get_github_events_per_repo(test_repo_config, "token", None)
+
+    assert [e["id"] for e in result] == [e["id"] for e in stub.events["owner-0/repo-0"]]
+    assert etag == stub.events_etag("owner-0/repo-0")
+
+
+def test_get_github_events_per_repo_etag(stub):
+    _, etag = github_api.get_github_events_per_repo(test_repo_config, "token", None)
+
+    assert github_api.get_github_events_per_repo(test_repo_config, "token", etag) == (None, None)
+
+    repository = stub.repositories["owner-0/repo-0"]
+    stub.add_events("owner-0/repo-0", generate_events(repository, 1, first_event_id=1000))
+    result, _ = github_api.get_github_events_per_repo(test_repo_config, "token", etag)
+
+    assert result[0]["id"] == "1000"
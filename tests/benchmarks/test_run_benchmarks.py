@@ -0,0 +1,32 @@
+from benchmarks.run_benchmarks import compare_results, run_benchmarks
+from benchmarks.synthetic import generate_dataset
+
+
+def test_generate_dataset_unique_event_ids():
+    dataset = generate_dataset(n_repos=3, n_events_per_repo=10)
+    event_ids = [e["id"] for _, events in dataset for e in events]
+
+    assert len(set(event_ids)) == 30
+
+
+def test_run_benchmarks():
+    result = run_benchmarks(n_repos=2, n_events=50, n_requests=2, n_startup_runs=1)
+
+    assert result["ingest"]["events"] == 100
+    assert all(r["seconds"] > 0 for r in result.values())
+
+
+def test_compare_results():
+    baseline = {"benchmarks": {"ingest": {"seconds": 1.0}, "statistics": {"seconds": 1.0}}}
+    current = {
+        "benchmarks": {
+            "ingest": {"seconds": 1.1},
+            "statistics": {"seconds": 1.5},
+            "new": {"seconds": 1.0},
+        }
+    }
+
+    result = compare_results(baseline, current, tolerance=0.2)
+
+    assert len(result) == 1
+    assert result[0].startswith("statistics")
@@ -0,0 +1,43 @@
+import pytest
+from sqlalchemy.pool import StaticPool
+from sqlmodel import SQLModel, create_engine
+
+from github_events_api import data_storage
+
+
+@pytest.fixture
+def test_engine(monkeypatch):
+    # in-memory db shared across sessions
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    monkeypatch.setattr(data_storage, "engine", engine)
+    SQLModel.metadata.create_all(engine)
+
+    yield engine
+
+    engine.dispose()
+
+
+@pytest.fixture
+def repo_data():
+    return {
+        "id": 111,
+        "name": "test-repo",
+        "owner": {"login": "test-owner"},
+        "full_name": "test-owner/test-repo",
+    }
+
+
+@pytest.fixture
+def event_data(repo_data):
+    def _event(event_id: int, created_at: str, event_type: str = "WatchEvent") -> dict:
+        return {
+            "id": event_id,
+            "type": event_type,
+            "actor": {"id": 11},
+            "repo": {"id": repo_data["id"]},
+            "created_at": created_at,
+        }
+
+    return _event
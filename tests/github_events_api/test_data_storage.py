@@ -0,0 +1,149 @@
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+import pandas as pd
+import pytest
+from sqlalchemy import event
+from sqlmodel import Session, select
+
+from github_events_api.data_storage import (
+    StatisticsHistory,
+    StatisticsSketch,
+    create_events,
+    create_repository,
+    create_statistics_history,
+    downsample_statistics_history,
+    find_statistics_history,
+    find_time_diff_quantiles,
+)
+from github_events_api.sketches import QuantileSketch
+
+
+def test_create_events_returns_only_new(test_engine, repo_data, event_data):
+    create_repository(repo_data, None)
+    create_events([event_data(1, "2024-08-28T00:00:00Z")])
+
+    result = create_events(
+        [event_data(1, "2024-08-28T00:00:00Z"), event_data(2, "2024-08-28T00:01:00Z")]
+    )
+
+    assert [e.id for e in result] == [2]
+
+
+def test_create_events_updates_sketches_incrementally(test_engine, repo_data, event_data):
+    create_repository(repo_data, None)
+    create_events([event_data(1, "2024-08-28T00:00:00Z"), event_data(2, "2024-08-28T00:01:00Z")])
+    create_events([event_data(3, "2024-08-28T00:11:00Z")])
+
+    with Session(test_engine) as session:
+        record = session.exec(select(StatisticsSketch)).one()
+    result = find_time_diff_quantiles("test-owner", "test-repo", "WatchEvent")
+
+    assert record.to_sketch().count == 2
+    assert result is not None
+    assert round(result["p50"]) == 60
+
+
+def test_create_events_with_failed_sketch_update(test_engine, repo_data, event_data, monkeypatch):
+    create_repository(repo_data, None)
+    events = [event_data(1, "2024-08-28T00:00:00Z"), event_data(2, "2024-08-28T00:01:00Z")]
+
+    with monkeypatch.context() as m:
+        m.setattr(QuantileSketch, "add", mock.Mock(side_effect=RuntimeError))
+        with pytest.raises(RuntimeError):
+            create_events(events)
+    # events of the failed run are downloaded again
+    result = create_events(events)
+
+    with Session(test_engine) as session:
+        record = session.exec(select(StatisticsSketch)).one()
+
+    assert len(result) == 2
+    assert record.to_sketch().count == 1
+
+
+def test_find_time_diff_quantiles_missing(test_engine, repo_data):
+    create_repository(repo_data, None)
+
+    assert find_time_diff_quantiles("test-owner", "test-repo", "WatchEvent") is None
+
+
+def _create_history(computed_at: list[datetime]) -> None:
+    stats = pd.DataFrame([{"repo_id": 111, "type": "WatchEvent", "avg_time_diff_secs": 60.0}])
+    for c in computed_at:
+        create_statistics_history(stats, c)
+
+
+def test_find_statistics_history_range(test_engine, repo_data):
+    create_repository(repo_data, None)
+    _create_history([datetime(2024, 8, d) for d in (1, 2, 3, 4)])
+
+    result = find_statistics_history(
+        "test-owner", "test-repo", "WatchEvent", datetime(2024, 8, 2), datetime(2024, 8, 3)
+    )
+
+    assert [r.computed_at for r in result] == [datetime(2024, 8, 2), datetime(2024, 8, 3)]
+
+
+def test_find_statistics_history_timezone_aware_range(test_engine, repo_data):
+    create_repository(repo_data, None)
+    _create_history([datetime(2024, 8, 1, 10)])
+    tz = timezone(timedelta(hours=2))
+
+    result = find_statistics_history(
+        "test-owner",
+        "test-repo",
+        "WatchEvent",
+        datetime(2024, 8, 1, 11, 30, tzinfo=tz),
+        datetime(2024, 8, 1, 12, 30, tzinfo=tz),
+    )
+
+    assert [r.computed_at for r in result] == [datetime(2024, 8, 1, 10)]
+
+
+def test_find_statistics_history_uses_index(test_engine, repo_data):
+    create_repository(repo_data, None)
+    statements = []
+
+    def _capture(conn, cursor, statement, parameters, context, executemany):
+        if "FROM statisticshistory" in statement:
+            statements.append((statement, parameters))
+
+    event.listen(test_engine, "before_cursor_execute", _capture)
+    find_statistics_history(
+        "test-owner", "test-repo", "WatchEvent", datetime(2024, 8, 2), datetime(2024, 8, 3)
+    )
+    event.remove(test_engine, "before_cursor_execute", _capture)
+
+    ((statement, parameters),) = statements
+    with test_engine.connect() as connection:
+        plan = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+
+    assert [row[-1] for row in plan] == [
+        "SEARCH statisticshistory USING INDEX ix_statisticshistory_repo_type_time "
+        "(repo_id=? AND event_type=? AND computed_at>? AND computed_at<?)"
+    ]
+
+
+def test_downsample_statistics_history(test_engine, repo_data):
+    create_repository(repo_data, None)
+    _create_history(
+        [
+            datetime(2023, 1, 1),  # expired
+            datetime(2024, 8, 1, 6),  # downsampled
+            datetime(2024, 8, 1, 12),
+            datetime(2024, 8, 27, 6),  # full resolution
+            datetime(2024, 8, 27, 12),
+        ]
+    )
+
+    downsample_statistics_history(datetime(2024, 8, 28), full_resolution_days=7, retention_days=365)
+
+    with Session(test_engine) as session:
+        result = session.exec(select(StatisticsHistory.computed_at)).all()
+
+    assert sorted(result) == [
+        datetime(2024, 8, 1, 12),
+        datetime(2024, 8, 27, 6),
+        datetime(2024, 8, 27, 12),
+    ]
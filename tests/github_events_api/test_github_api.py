@@ -11,6 +11,7 @@ from github_events_api.github_api import (
     get_github_events_per_repo,
     get_repository_info,
 )
+from github_events_api.metrics import GITHUB_REQUEST_RETRIES, GITHUB_REQUEST_SECONDS
 
 test_repo_config = RepositoryConfig(**{"owner": "test-owner", "name": "test-repo"})
 
@@ -96,3 +97,20 @@ def test_get_github_events_per_repo_no_new_data(mock_github_api, caplog):
     assert result is None
     assert etag is None
     assert f"There are no new events for {test_repo_config.full_name} repository." in caplog.text
+
+
+def test_get_repository_info_retries_exhausted(mock_github_api):
+    mock_github_api.get(
+        f"{GITHUB_API_REPOS_URL}/test-owner/test-repo",
+        exc=requests.exceptions.RetryError("too many 503"),
+    )
+    retries_before = GITHUB_REQUEST_RETRIES._values.get(("repository",), 0)
+
+    with pytest.raises(requests.exceptions.RetryError):
+        get_repository_info(test_repo_config, "token")
+
+    assert GITHUB_REQUEST_RETRIES._values[("repository",)] - retries_before == 4
+    assert (
+        'github_request_seconds_count{endpoint="repository",status="retries_exhausted"}'
+        in GITHUB_REQUEST_SECONDS.render()
+    )
@@ -0,0 +1,106 @@
+import asyncio
+from datetime import datetime
+
+import pandas as pd
+
+from github_events_api import live_updates
+from github_events_api.data_storage import (
+    StatisticsGeneration,
+    create_repository,
+    find_stats_page,
+    replace_statistics,
+)
+from github_events_api.live_updates import StatisticsBroadcaster
+
+
+def _commit_generation(watch_avg: float, push_avg: float) -> None:
+    replace_statistics(
+        pd.DataFrame(
+            [
+                {"repo_id": 111, "type": "WatchEvent", "avg_time_diff_secs": watch_avg},
+                {"repo_id": 111, "type": "PushEvent", "avg_time_diff_secs": push_avg},
+            ]
+        ),
+        datetime(2024, 8, 28),
+    )
+
+
+def test_check_for_changes(test_engine, repo_data):
+    create_repository(repo_data, None)
+    broadcaster = StatisticsBroadcaster()
+
+    # db without any generation, e.g. before the first ingestion
+    assert broadcaster.check_for_changes() == []
+
+    _commit_generation(60.0, 120.0)
+    result = broadcaster.check_for_changes()
+
+    # all records of the first generation are new
+    assert sorted(s["event_type"] for s in result) == ["PushEvent", "WatchEvent"]
+
+    _commit_generation(60.0, 180.0)
+    result = broadcaster.check_for_changes()
+
+    assert [(s["event_type"], s["avg_time_diff_secs"]) for s in result] == [("PushEvent", 180.0)]
+    # no new generation
+    assert broadcaster.check_for_changes() == []
+
+    # existing generation is only loaded by the first check
+    assert StatisticsBroadcaster().check_for_changes() == []
+
+
+def test_check_for_changes_db_without_generations(test_engine, repo_data):
+    create_repository(repo_data, None)
+    # db written before statistics generations were introduced
+    StatisticsGeneration.__table__.drop(test_engine)
+    broadcaster = StatisticsBroadcaster()
+
+    assert broadcaster.check_for_changes() == []
+
+    StatisticsGeneration.__table__.create(test_engine)
+    _commit_generation(60.0, 120.0)
+
+    assert len(broadcaster.check_for_changes()) == 2
+
+
+def test_check_for_changes_generation_committed_while_loading(test_engine, repo_data, monkeypatch):
+    create_repository(repo_data, None)
+    _commit_generation(60.0, 120.0)
+    broadcaster = StatisticsBroadcaster()
+    broadcaster.check_for_changes()
+    _commit_generation(60.0, 180.0)
+
+    def _find_stats_page(after_id, limit):
+        result = find_stats_page(after_id=after_id, limit=limit)
+        # the next generation is committed after the first page was read
+        if after_id is None and result[0] == 2:
+            _commit_generation(90.0, 180.0)
+        return result
+
+    monkeypatch.setattr(live_updates, "STATS_LOAD_PAGE_SIZE", 1)
+    monkeypatch.setattr(live_updates, "find_stats_page", _find_stats_page)
+    result = broadcaster.check_for_changes()
+
+    assert sorted((s["event_type"], s["avg_time_diff_secs"]) for s in result) == [
+        ("PushEvent", 180.0),
+        ("WatchEvent", 90.0),
+    ]
+    # the next check has no changes
+    assert broadcaster.check_for_changes() == []
+
+
+def test_publish_to_subscribers():
+    async def _publish() -> tuple[list, int]:
+        broadcaster = StatisticsBroadcaster()
+        subscribed = broadcaster.subscribe()
+        unsubscribed = broadcaster.subscribe()
+        broadcaster.unsubscribe(unsubscribed)
+
+        broadcaster.publish([{"repo_id": 111}])
+
+        return await subscribed.get(), unsubscribed.qsize()
+
+    received, unsubscribed_size = asyncio.run(_publish())
+
+    assert received == [{"repo_id": 111}]
+    assert unsubscribed_size == 0
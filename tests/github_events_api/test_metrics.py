@@ -0,0 +1,54 @@
+import pytest
+
+from github_events_api.metrics import REGISTRY, Counter, Gauge, Histogram
+
+
+@pytest.fixture(autouse=True)
+def clean_registry():
+    registered = list(REGISTRY)
+    yield
+    REGISTRY[:] = registered
+
+
+def test_counter_render():
+    counter = Counter("test_total", "Test counter.", ("status",))
+    counter.inc(status=200)
+    counter.inc(2, status=200)
+    counter.inc(status=304)
+
+    assert counter.render().splitlines() == [
+        "# HELP test_total Test counter.",
+        "# TYPE test_total counter",
+        'test_total{status="200"} 3.0',
+        'test_total{status="304"} 1.0',
+    ]
+
+
+def test_gauge_set():
+    gauge = Gauge("test_gauge", "Test gauge.")
+    gauge.set(10)
+    gauge.set(5)
+
+    assert gauge.render().splitlines()[-1] == "test_gauge 5.0"
+
+
+def test_histogram_render():
+    histogram = Histogram("test_seconds", "Test histogram.", buckets=(0.1, 1.0))
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5)
+
+    assert histogram.render().splitlines()[2:] == [
+        'test_seconds_bucket{le="0.1"} 1.0',
+        'test_seconds_bucket{le="1.0"} 2.0',
+        'test_seconds_bucket{le="+Inf"} 3.0',
+        "test_seconds_sum 5.55",
+        "test_seconds_count 3.0",
+    ]
+
+
+def test_wrong_labels():
+    counter = Counter("test_total", "Test counter.", ("status",))
+
+    with pytest.raises(ValueError, match="expects labels"):
+        counter.inc(endpoint="events")
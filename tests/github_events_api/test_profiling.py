@@ -0,0 +1,34 @@
+import json
+
+from github_events_api.profiling import CPROFILE_FILENAME, REPORT_FILENAME, StageProfiler
+
+
+def test_disabled_profiler(tmp_path):
+    with StageProfiler(output_dir=str(tmp_path)) as profiler:
+        with profiler.stage("stage"):
+            pass
+
+    assert profiler.stages == []
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_nested_stages(tmp_path):
+    with StageProfiler(
+        enabled=True, output_dir=str(tmp_path), trace_memory=True, cprofile=True
+    ) as profiler:
+        with profiler.stage("outer"):
+            with profiler.stage("inner"):
+                data = [0] * 1_000_000
+            del data
+
+    outer, inner = profiler.stages
+
+    assert [(s["stage"], s["depth"]) for s in profiler.stages] == [("outer", 0), ("inner", 1)]
+    assert outer["wall_secs"] >= inner["wall_secs"]
+    # memory allocated in nested stage counts also into the outer one
+    assert inner["peak_memory_bytes"] >= 8_000_000
+    assert outer["peak_memory_bytes"] >= inner["peak_memory_bytes"]
+
+    with open(tmp_path / REPORT_FILENAME) as f:
+        assert json.load(f)["stages"] == profiler.stages
+    assert (tmp_path / CPROFILE_FILENAME).exists()
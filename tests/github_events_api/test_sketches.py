@@ -0,0 +1,75 @@
+from datetime import datetime
+
+import pytest
+
+from github_events_api.sketches import (
+    SKETCH_RELATIVE_ACCURACY,
+    QuantileSketch,
+    calculate_inter_event_times,
+)
+
+
+def _sketch_from(values: list[float]) -> QuantileSketch:
+    sketch = QuantileSketch()
+    for v in values:
+        sketch.add(v)
+    return sketch
+
+
+@pytest.mark.parametrize("q, exp_value", [(0.5, 500), (0.9, 900), (0.99, 990)])
+def test_quantile_within_relative_accuracy(q, exp_value):
+    sketch = _sketch_from(list(range(1, 1001)))
+
+    assert sketch.quantile(q) == pytest.approx(exp_value, rel=SKETCH_RELATIVE_ACCURACY)
+
+
+def test_quantile_empty_sketch():
+    assert QuantileSketch().quantile(0.5) is None
+
+
+def test_quantile_zeros():
+    sketch = _sketch_from([0, 0, 0, 10])
+
+    assert sketch.quantile(0.5) == 0.0
+    assert sketch.quantile(1) == pytest.approx(10, rel=SKETCH_RELATIVE_ACCURACY)
+
+
+def test_add_negative_value():
+    with pytest.raises(ValueError, match="non-negative"):
+        QuantileSketch().add(-1)
+
+
+def test_merge_equals_single_sketch():
+    merged = _sketch_from(list(range(1, 501)))
+    merged.merge(_sketch_from(list(range(501, 1001))))
+    single = _sketch_from(list(range(1, 1001)))
+
+    assert merged.count == single.count
+    assert merged.bins == single.bins
+
+
+def test_json_round_trip():
+    sketch = _sketch_from([0, 1.5, 20, 300])
+    result = QuantileSketch.from_json(sketch.to_json())
+
+    assert result.bins == sketch.bins
+    assert result.zero_count == sketch.zero_count
+    assert result.count == sketch.count
+
+
+@pytest.mark.parametrize(
+    "last_event_at, exp_result",
+    [
+        pytest.param(None, [60.0, 120.0], id="no_previous_event"),
+        pytest.param(datetime(2024, 8, 28, 0, 0), [0.0, 60.0, 120.0], id="previous_event"),
+        pytest.param(datetime(2024, 8, 28, 0, 1), [0.0, 120.0], id="skip_older_events"),
+    ],
+)
+def test_calculate_inter_event_times(last_event_at, exp_result):
+    timestamps = [
+        datetime(2024, 8, 28, 0, 3),
+        datetime(2024, 8, 28, 0, 0),
+        datetime(2024, 8, 28, 0, 1),
+    ]
+
+    assert calculate_inter_event_times(timestamps, last_event_at) == exp_result
@@ -0,0 +1,141 @@
+from datetime import datetime
+
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+from api_app import app
+from benchmarks.startup import bench_startup
+from github_events_api.data_storage import (
+    create_repository,
+    create_statistics_history,
+    replace_statistics,
+)
+
+
+def _statistics() -> pd.DataFrame:
+    return pd.DataFrame(
+        [
+            {"repo_id": 111, "type": "WatchEvent", "avg_time_diff_secs": 60.0},
+            {"repo_id": 111, "type": "PushEvent", "avg_time_diff_secs": 120.0},
+        ]
+    )
+
+
+@pytest.fixture
+def client(test_engine, repo_data):
+    create_repository(repo_data, None)
+    replace_statistics(_statistics(), datetime(2024, 8, 28))
+    return TestClient(app)
+
+
+def test_get_stats_batch(client):
+    queries = [
+        {"repo_owner": "test-owner", "repo_name": "test-repo", "event_type": "PushEvent"},
+        {"repo_owner": "test-owner", "repo_name": "test-repo", "event_type": "ForkEvent"},
+        {"repo_owner": "unknown", "repo_name": "test-repo", "event_type": "PushEvent"},
+    ]
+
+    response = client.post("/statistics/batch", json=queries)
+    results = response.json()["results"]
+
+    assert response.status_code == 200
+    assert [r["query"] for r in results] == queries
+    assert [s["avg_time_diff_secs"] for s in results[0]["result"]] == [120.0]
+    assert results[1]["result"] == []
+    assert results[2]["result"] is None
+
+
+def test_get_stats_batch_too_many_queries(client):
+    query = {"repo_owner": "test-owner", "repo_name": "test-repo", "event_type": "PushEvent"}
+
+    response = client.post("/statistics/batch", json=[query] * 1001)
+
+    assert response.status_code == 422
+
+
+def test_get_all_stats_pagination(client):
+    first_page = client.get("/", params={"limit": 1})
+    second_page = client.get(
+        "/", params={"limit": 1, "cursor": first_page.headers["X-Next-Cursor"]}
+    )
+
+    assert [s["event_type"] for s in first_page.json()] == ["WatchEvent"]
+    assert [s["event_type"] for s in second_page.json()] == ["PushEvent"]
+    # last page is full, but there are no more records
+    assert "X-Next-Cursor" not in second_page.headers
+
+
+def test_get_all_stats_pagination_across_generations(client):
+    first_page = client.get("/", params={"limit": 1})
+    replace_statistics(_statistics(), datetime(2024, 8, 29))
+
+    response = client.get("/", params={"limit": 1, "cursor": first_page.headers["X-Next-Cursor"]})
+
+    assert response.status_code == 410
+
+
+def test_get_all_stats_invalid_cursor(client):
+    response = client.get("/", params={"cursor": "invalid"})
+
+    assert response.status_code == 422
+
+
+def test_get_all_stats_ndjson(client):
+    response = client.get("/", params={"ndjson": True})
+    lines = response.text.splitlines()
+
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert len(lines) == 2
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_get_stats_history(client):
+    for day in (1, 2, 3):
+        create_statistics_history(_statistics(), datetime(2024, 8, day, 10))
+    params = {"repo_owner": "test-owner", "repo_name": "test-repo", "event_type": "PushEvent"}
+
+    response = client.get(
+        "/statistics/history/",
+        params={**params, "start": "2024-08-02T11:00:00+02:00", "end": "2024-08-03T10:00:00Z"},
+    )
+    unknown = client.get(
+        "/statistics/history/",
+        params={**params, "repo_owner": "unknown", "start": "2024-08-01", "end": "2024-08-03"},
+    )
+
+    assert response.status_code == 200
+    assert [r["computed_at"] for r in response.json()["result"]] == [
+        "2024-08-02T10:00:00",
+        "2024-08-03T10:00:00",
+    ]
+    assert unknown.json()["result"] == []
+
+
+def test_get_metrics(client):
+    client.get("/", params={"limit": 1})
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert 'api_request_seconds_count{method="GET",path="/",status="200"}' in response.text
+
+
+def test_get_metrics_unhandled_error(client):
+    error_client = TestClient(app, raise_server_exceptions=False)
+    # unknown repository raises KeyError
+    params = {"repo_owner": "unknown", "repo_name": "test-repo", "event_type": "WatchEvent"}
+
+    response = error_client.get("/statistics/", params=params)
+
+    assert response.status_code == 500
+    assert (
+        'api_request_seconds_count{method="GET",path="/statistics/",status="500"}'
+        in client.get("/metrics").text
+    )
+
+
+def test_api_app_does_not_import_heavy_modules():
+    result = bench_startup(n_runs=1)
+
+    assert result["heavy_modules"] == []
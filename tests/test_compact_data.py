@@ -0,0 +1,70 @@
+import gzip
+import json
+
+import pytest
+
+from benchmarks.github_stub import GithubStubServer
+from benchmarks.synthetic import generate_events, generate_repository
+from compact_data import main
+from download_data import download_events
+from github_events_api import github_api
+from github_events_api.configuation import RepositoryConfig
+from github_events_api.data_storage import create_events, create_repository, find_all_events
+from github_events_api.profiling import StageProfiler
+
+
+@pytest.fixture
+def events(test_engine, repo_data, event_data):
+    create_repository(repo_data, None)
+    create_events(
+        [
+            event_data(1, "2024-08-01T00:00:00Z", "WatchEvent"),  # outside window
+            event_data(2, "2024-08-21T00:00:00Z", "WatchEvent"),  # start of the window
+            event_data(3, "2024-08-28T00:00:00Z", "WatchEvent"),
+            # window is calculated for each event type separately
+            event_data(4, "2024-08-01T00:00:00Z", "PushEvent"),
+        ]
+    )
+
+
+def test_main_prunes_events_outside_window(events, tmp_path):
+    main(archive_dir=str(tmp_path))
+
+    (archive_path,) = tmp_path.iterdir()
+    with gzip.open(archive_path, "rt") as f:
+        archived = [json.loads(line) for line in f]
+
+    assert sorted(e.id for e in find_all_events()) == [2, 3, 4]
+    assert [e["id"] for e in archived] == [1]
+
+
+def test_main_keep_days(events):
+    main(keep_days=30)
+
+    assert len(find_all_events()) == 4
+
+
+def test_main_keep_days_under_window(events):
+    with pytest.raises(ValueError, match="statistics window"):
+        main(keep_days=1)
+
+
+def test_main_pruned_events_are_not_ingested_again(test_engine, monkeypatch):
+    repository = generate_repository(repo_id=1, owner="owner-0", name="repo-0")
+    # one event per day on average, so that part of them is outside the window
+    events = generate_events(repository, n_events=50, mean_time_diff_secs=86400.0)
+    repos = (RepositoryConfig(owner="owner-0", name="repo-0"),)
+
+    with GithubStubServer([(repository, events)]) as stub:
+        monkeypatch.setattr(github_api, "GITHUB_API_REPOS_URL", f"{stub.url}/repos")
+        download_events(repos, "token", StageProfiler())
+        main()
+        n_kept = len(find_all_events())
+
+        # Github API returns the new event together with the already pruned ones
+        latest = max(e.created_at for e in find_all_events())
+        stub.add_events("owner-0/repo-0", generate_events(repository, 1, 1000, start=latest))
+        download_events(repos, "token", StageProfiler())
+
+    assert n_kept < 50
+    assert len(find_all_events()) == n_kept + 1
@@ -0,0 +1,72 @@
+import pytest
+
+from benchmarks.github_stub import GithubStubServer
+from benchmarks.synthetic import generate_dataset
+from download_data import download_events, parse_args, resolve_repositories
+from github_events_api import github_api
+from github_events_api.configuation import RepositoryConfig
+from github_events_api.data_storage import (
+    create_repositories,
+    find_all_events,
+    find_all_repositories,
+)
+from github_events_api.profiling import StageProfiler
+
+repos = (
+    RepositoryConfig(owner="owner-0", name="repo-0"),
+    RepositoryConfig(owner="owner-1", name="repo-1"),
+)
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    with GithubStubServer(generate_dataset(n_repos=2, n_events_per_repo=50)) as server:
+        monkeypatch.setattr(github_api, "GITHUB_API_REPOS_URL", f"{server.url}/repos")
+        yield server
+
+
+def test_resolve_repositories_requests_only_unknown(test_engine, stub):
+    create_repositories([stub.repositories["owner-0/repo-0"]])
+    requests_before = stub.requests_count
+
+    result = resolve_repositories(repos, "token")
+
+    assert {k: r.id for k, r in result.items()} == {"owner-0/repo-0": 1, "owner-1/repo-1": 2}
+    assert stub.requests_count - requests_before == 1
+    assert set(find_all_repositories()) == {"owner-0/repo-0", "owner-1/repo-1"}
+
+
+def test_resolve_repositories_duplicate_in_config(test_engine, stub):
+    result = resolve_repositories((*repos, repos[1]), "token")
+
+    assert {k: r.id for k, r in result.items()} == {"owner-0/repo-0": 1, "owner-1/repo-1": 2}
+    assert stub.requests_count == 2
+
+
+def test_download_events(test_engine, stub):
+    download_events(repos, "token", StageProfiler())
+
+    etags = {r.id: r.etag for r in find_all_repositories().values()}
+
+    assert len(find_all_events()) == 100
+    assert etags == {
+        1: stub.events_etag("owner-0/repo-0"),
+        2: stub.events_etag("owner-1/repo-1"),
+    }
+
+
+def test_download_events_profile_stages(test_engine, stub):
+    profiler = StageProfiler(enabled=True)
+    with profiler:
+        download_events(repos[:1], "token", profiler)
+
+    stages = [(s["stage"], s["depth"]) for s in profiler.stages]
+
+    assert ("create_events", 1) in stages
+    assert ("update_statistics_sketches", 2) in stages
+
+
+@pytest.mark.parametrize("option", ["--profile-memory", "--profile-cprofile"])
+def test_parse_args_profile_options_imply_profile(option):
+    assert parse_args([option]).profile
+    assert not parse_args([]).profile